@@ -53,9 +53,10 @@ class BaseTool(ABC):
         model: str = None,
         temperature: float = 0.1,
         max_tokens: int = 1024,
-        json_mode: bool = False
+        json_mode: bool = False,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
-        """Call LLM for tool operations"""
+        """Call LLM for tool operations (streamed to on_token when given)"""
         if not self.llm:
             raise ValueError("LLM client not set for this tool")
         
@@ -64,7 +65,8 @@ class BaseTool(ABC):
             model=model or MODELS.get('evaluator', 'llama-3.1-8b-instant'),
             temperature=temperature,
             max_tokens=max_tokens,
-            json_mode=json_mode
+            json_mode=json_mode,
+            on_token=on_token
         )
 
 
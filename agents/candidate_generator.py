@@ -103,8 +103,19 @@ SQL Guidelines:
 7. Add LIMIT for large result sets
 8. Handle NULLs appropriately (COALESCE, IS NULL)
 
+Think step by step:
+1. What data is being requested?
+2. Which tables contain this data?
+3. What columns to SELECT?
+4. What JOINs are needed?
+5. What WHERE conditions apply?
+6. Is GROUP BY needed?
+7. What ORDER BY makes sense?
+
 Output ONLY the SQL query in ```sql``` code blocks."""
 
+        # Keep all static guidance in the system prompt so the prefix is
+        # identical across questions and eligible for provider prompt caching
         user_content = f"""Generate a PostgreSQL query for this question:
 
 QUESTION: {question}
@@ -113,15 +124,6 @@ DATABASE SCHEMA:
 {schema_context}
 {entity_context}
 
-Think step by step:
-1. What data is being requested?
-2. Which tables contain this data?
-3. What columns to SELECT?
-4. What JOINs are needed?
-5. What WHERE conditions apply?
-6. Is GROUP BY needed?
-7. What ORDER BY makes sense?
-
 Generate the SQL query:"""
 
         messages = [
@@ -379,10 +381,15 @@ Common issues and fixes:
 
 Return ONLY the fixed SQL query in ```sql``` code blocks."""
 
+        # Faulty candidates of one question share the question and schema, so
+        # those lead the prompt (a cacheable prefix) and the SQL/error follow
         user_content = f"""Fix this SQL query that has an error:
 
 ORIGINAL QUESTION: {question}
 
+SCHEMA REFERENCE:
+{schema_context}
+
 FAULTY SQL:
 ```sql
 {sql}
@@ -391,9 +398,6 @@ FAULTY SQL:
 ERROR:
 {error}
 
-SCHEMA REFERENCE:
-{schema_context}
-
 Analyze the error and provide the corrected SQL query:"""
 
         messages = [
@@ -505,6 +509,10 @@ Your job is to generate accurate SQL queries and fix any errors."""
         candidates = [None] * len(strategies[:num_candidates])
 
         def generate_candidate(idx, strategy):
+            # Generation, the error check and any revisions all run in the
+            # worker, so one candidate's revise round-trips overlap with the
+            # others' instead of being replayed one by one afterwards
+            calls = []
             self.log(f"Generating candidate {idx+1} with {strategy} strategy...")
             gen_result = self.call_tool(
                 "generate_candidate_query",
@@ -513,52 +521,52 @@ Your job is to generate accurate SQL queries and fix any errors."""
                 entities=entities,
                 strategy=strategy
             )
-            return (idx, gen_result)
-
-        # Generate candidates in parallel
+            calls.append(gen_result)
+            if not gen_result.success or not gen_result.data.get('sql'):
+                return idx, None, calls
+            sql = gen_result.data['sql']
+            # Execute to check for errors
+            exec_result = self._execute_and_check(sql)
+            candidate = {
+                'sql': sql,
+                'strategy': strategy,
+                'is_valid': exec_result['valid'],
+                'error': exec_result.get('error'),
+                'result_preview': exec_result.get('preview'),
+                'was_revised': False
+            }
+            # If error, try to revise
+            if not exec_result['valid'] and exec_result.get('error'):
+                self.log(f"Revising candidate {idx+1} due to error...")
+                for revision_attempt in range(max_revisions):
+                    revise_result = self.call_tool(
+                        "revise",
+                        sql=candidate['sql'],
+                        error=candidate['error'],
+                        question=question,
+                        schema_context=schema_context
+                    )
+                    calls.append(revise_result)
+                    if revise_result.success and revise_result.data.get('revised_sql'):
+                        revised_sql = revise_result.data['revised_sql']
+                        exec_result = self._execute_and_check(revised_sql)
+                        candidate['sql'] = revised_sql
+                        candidate['is_valid'] = exec_result['valid']
+                        candidate['error'] = exec_result.get('error')
+                        candidate['result_preview'] = exec_result.get('preview')
+                        candidate['was_revised'] = True
+                        if exec_result['valid']:
+                            self.log(f"Candidate {idx+1} fixed after revision", "success")
+                            break
+            return idx, candidate, calls
+
+        # Generate, check and revise candidates in parallel
         with ThreadPoolExecutor(max_workers=len(strategies[:num_candidates])) as executor:
             futures = [executor.submit(generate_candidate, i, strategy) for i, strategy in enumerate(strategies[:num_candidates])]
             for future in as_completed(futures):
-                idx, gen_result = future.result()
-                tool_calls.append(gen_result)
-                total_tokens += gen_result.tokens_used
-                if not gen_result.success or not gen_result.data.get('sql'):
-                    continue
-                sql = gen_result.data['sql']
-                # Execute to check for errors
-                exec_result = self._execute_and_check(sql)
-                candidate = {
-                    'sql': sql,
-                    'strategy': strategies[idx],
-                    'is_valid': exec_result['valid'],
-                    'error': exec_result.get('error'),
-                    'result_preview': exec_result.get('preview'),
-                    'was_revised': False
-                }
-                # If error, try to revise
-                if not exec_result['valid'] and exec_result.get('error'):
-                    self.log(f"Revising candidate {idx+1} due to error...")
-                    for revision_attempt in range(max_revisions):
-                        revise_result = self.call_tool(
-                            "revise",
-                            sql=candidate['sql'],
-                            error=candidate['error'],
-                            question=question,
-                            schema_context=schema_context
-                        )
-                        tool_calls.append(revise_result)
-                        total_tokens += revise_result.tokens_used
-                        if revise_result.success and revise_result.data.get('revised_sql'):
-                            revised_sql = revise_result.data['revised_sql']
-                            exec_result = self._execute_and_check(revised_sql)
-                            candidate['sql'] = revised_sql
-                            candidate['is_valid'] = exec_result['valid']
-                            candidate['error'] = exec_result.get('error')
-                            candidate['result_preview'] = exec_result.get('preview')
-                            candidate['was_revised'] = True
-                            if exec_result['valid']:
-                                self.log(f"Candidate {idx+1} fixed after revision", "success")
-                                break
+                idx, candidate, calls = future.result()
+                tool_calls.extend(calls)
+                total_tokens += sum(call.tokens_used for call in calls)
                 candidates[idx] = candidate
 
         # Remove None entries
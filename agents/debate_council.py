@@ -8,6 +8,8 @@ from langchain_groq import ChatGroq
 from langgraph.graph import StateGraph, END
 from dotenv import load_dotenv
 
+from sage_code.graph_builder import load_graph_file
+
 load_dotenv()
 
 # Config
@@ -45,7 +47,7 @@ class DebateCouncil:
                 
             if os.path.exists(full_path):
                 print(f"Loading graph from {full_path}...")
-                return nx.read_graphml(full_path)
+                return load_graph_file(full_path)
             print(f"Graph file not found at {full_path}, using empty graph")
             return nx.DiGraph()
         except Exception as e:
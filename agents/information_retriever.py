@@ -8,6 +8,7 @@ Tools:
 3. retrieve_context - Get relevant schema descriptions from vector DB
 """
 from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 from agents.base_agent import BaseAgent, BaseTool, AgentResult, ToolResult
@@ -17,6 +18,39 @@ from utils.llm_client import GroqLLMClient
 from config.settings import MODELS
 
 
+# Phrases that indicate a question about the database itself
+META_QUESTION_KEYWORDS = (
+    'how many studies', 'number of studies', 'count studies',
+    'list studies', 'all studies', 'which studies', 'what studies',
+    'total studies', 'studies are there', 'studies exist',
+    'how many tables', 'database info', 'database structure'
+)
+
+# Clinical terms mapped to table categories
+TERM_TO_CATEGORY = (
+    ('visit', 'visit'),
+    ('patient', 'visit'),
+    ('subject', 'visit'),
+    ('query', 'query'),
+    ('queries', 'query'),
+    ('edrr', 'query'),
+    ('safety', 'safety'),
+    ('sae', 'safety'),
+    ('esae', 'safety'),
+    ('adverse', 'safety'),
+    ('coding', 'coding'),
+    ('meddra', 'coding'),
+    ('whodd', 'coding'),
+    ('lab', 'lab'),
+    ('laboratory', 'lab'),
+    ('edc', 'edc_metrics'),
+    ('metrics', 'edc_metrics'),
+    ('form', 'forms'),
+    ('page', 'pages'),
+    ('missing', 'pages'),
+)
+
+
 # ============== TOOLS ==============
 
 class ExtractKeywordsTool(BaseTool):
@@ -52,20 +86,21 @@ Return a JSON object with:
     "entities": ["entity values to search for"],
     "clinical_terms": ["domain-specific terms"],
     "filters": ["filter conditions mentioned"]
-}"""
-
-        user_content = f"""Extract keywords from this clinical trial database question:
-
-Question: "{question}"
+}
 
 Examples:
 Q: "How many open queries are there for site 101?"
-A: {{"keywords": ["open", "queries", "site"], "entities": ["101", "site 101"], "clinical_terms": ["queries"], "filters": ["open"]}}
+A: {"keywords": ["open", "queries", "site"], "entities": ["101", "site 101"], "clinical_terms": ["queries"], "filters": ["open"]}
 
 Q: "Show patients with missing visit data in Study 5"
-A: {{"keywords": ["patients", "missing", "visit", "data", "study"], "entities": ["Study 5", "5"], "clinical_terms": ["visit"], "filters": ["missing"]}}
+A: {"keywords": ["patients", "missing", "visit", "data", "study"], "entities": ["Study 5", "5"], "clinical_terms": ["visit"], "filters": ["missing"]}"""
+
+        # Static instructions and few-shot examples live in the system prompt so
+        # the request prefix is byte-identical across questions and can be served
+        # from the provider's prompt cache; only the question varies.
+        user_content = f"""Extract keywords from this clinical trial database question:
 
-Now extract for the given question:"""
+Question: "{question}\""""
 
         messages = [
             {"role": "system", "content": system_prompt},
@@ -234,7 +269,7 @@ Your job is to gather all relevant information needed to answer questions about
         Execute IR agent pipeline:
         1. Extract keywords from question
         2. Retrieve matching entities from database
-        3. Get relevant schema context
+        3. Get relevant schema context (overlapped with step 1)
         
         Args:
             question: Natural language question
@@ -247,9 +282,21 @@ Your job is to gather all relevant information needed to answer questions about
         tool_calls = []
         total_tokens = 0
         
-        # Step 1: Extract keywords
-        self.log("Extracting keywords...")
-        keywords_result = self.call_tool("extract_keywords", question=question)
+        # Schema context only depends on the question, so retrieve it while
+        # the keyword extraction LLM round-trip is in flight
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            context_future = executor.submit(
+                self.call_tool,
+                "retrieve_context",
+                question=question,
+                top_k=10
+            )
+            
+            # Step 1: Extract keywords
+            self.log("Extracting keywords...")
+            keywords_result = self.call_tool("extract_keywords", question=question)
+            context_result = context_future.result()
+        
         tool_calls.append(keywords_result)
         total_tokens += keywords_result.tokens_used
         
@@ -278,13 +325,7 @@ Your job is to gather all relevant information needed to answer questions about
         )
         tool_calls.append(entity_result)
         
-        # Step 3: Retrieve context
-        self.log("Retrieving schema context...")
-        context_result = self.call_tool(
-            "retrieve_context",
-            question=question,
-            top_k=10
-        )
+        # Step 3: Schema context (retrieved alongside step 1)
         tool_calls.append(context_result)
         
         # Combine all retrieved information
@@ -325,12 +366,8 @@ Your job is to gather all relevant information needed to answer questions about
         
         # Check for meta-questions about the database itself
         question_lower = question.lower() if question else ""
-        meta_keywords = ['how many studies', 'number of studies', 'count studies', 
-                        'list studies', 'all studies', 'which studies', 'what studies',
-                        'total studies', 'studies are there', 'studies exist',
-                        'how many tables', 'database info', 'database structure']
         
-        if any(mk in question_lower for mk in meta_keywords):
+        if any(mk in question_lower for mk in META_QUESTION_KEYWORDS):
             # Add metadata tables for meta-questions
             tables.add('_studies')
             tables.add('_table_metadata')
@@ -344,36 +381,19 @@ Your job is to gather all relevant information needed to answer questions about
         for table in context_data.get('relevant_tables', {}).keys():
             tables.add(table)
         
-        # From clinical terms mapping
-        term_to_category = {
-            'visit': 'visit',
-            'patient': 'visit',
-            'subject': 'visit',
-            'query': 'query',
-            'queries': 'query',
-            'edrr': 'query',
-            'safety': 'safety',
-            'sae': 'safety',
-            'esae': 'safety',
-            'adverse': 'safety',
-            'coding': 'coding',
-            'meddra': 'coding',
-            'whodd': 'coding',
-            'lab': 'lab',
-            'laboratory': 'lab',
-            'edc': 'edc_metrics',
-            'metrics': 'edc_metrics',
-            'form': 'forms',
-            'page': 'pages',
-            'missing': 'pages'
-        }
-        
+        # From clinical terms mapping; collect the matched categories first so
+        # a category hit by several terms is looked up once, and its remaining
+        # keys are not tested again
+        matched_categories = set()
         for term in keywords_data.get('clinical_terms', []) + keywords_data.get('keywords', []):
             term_lower = term.lower()
-            for key, category in term_to_category.items():
-                if key in term_lower:
-                    category_tables = self.schema.get_tables_by_category(category)
-                    for t in category_tables[:3]:  # Limit per category
-                        tables.add(t.name)
+            for key, category in TERM_TO_CATEGORY:
+                if category not in matched_categories and key in term_lower:
+                    matched_categories.add(category)
+        
+        for category in matched_categories:
+            category_tables = self.schema.get_tables_by_category(category)
+            for t in category_tables[:3]:  # Limit per category
+                tables.add(t.name)
         
         return list(tables)
@@ -7,7 +7,7 @@ Tools:
 2. summarize_large_results - Summarize large result sets with key insights
 3. split_complex_query - Split complex joins into simpler interpretable queries
 """
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple, Callable
 import time
 import json
 
@@ -39,7 +39,8 @@ class ExplainResultsTool(BaseTool):
         results: List[Dict],
         columns: List[str],
         row_count: int,
-        max_rows_for_context: int = 20
+        max_rows_for_context: int = 20,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> ToolResult:
         """
         Explain query results in natural language
@@ -51,6 +52,7 @@ class ExplainResultsTool(BaseTool):
             columns: Column names
             row_count: Total number of rows
             max_rows_for_context: Max rows to include in prompt
+            on_token: Optional callback receiving the explanation as it streams
         """
         # Sample results if too large
         sampled_results = results[:max_rows_for_context] if len(results) > max_rows_for_context else results
@@ -99,7 +101,8 @@ Provide a clear, natural language explanation of these results that directly ans
             messages,
             model=MODELS.get('sql_generator'),
             temperature=0.3,
-            max_tokens=1500
+            max_tokens=1500,
+            on_token=on_token
         )
         
         if not response.get('content'):
@@ -171,7 +174,8 @@ class SummarizeLargeResultsTool(BaseTool):
         sql: str,
         results: List[Dict],
         columns: List[str],
-        row_count: int
+        row_count: int,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> ToolResult:
         """
         Provide summary statistics for large results
@@ -224,7 +228,8 @@ Provide a comprehensive but concise summary."""
             messages,
             model=MODELS.get('sql_generator'),
             temperature=0.3,
-            max_tokens=1500
+            max_tokens=1500,
+            on_token=on_token
         )
         
         tokens = response['usage']['input_tokens'] + response['usage']['output_tokens']
@@ -440,7 +445,8 @@ Your job is to:
         execution_result: Dict[str, Any],
         schema_context: str = "",
         max_rows_for_detail: int = 50,
-        max_rows_for_context: int = 20
+        max_rows_for_context: int = 20,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> AgentResult:
         """
         Execute the Result Explainer agent
@@ -452,6 +458,8 @@ Your job is to:
             schema_context: Optional schema context for better explanations
             max_rows_for_detail: Threshold for detailed vs summary explanation
             max_rows_for_context: Max rows to send to LLM
+            on_token: Optional callback that receives the explanation text as
+                it streams (single-query path only; split queries are combined)
             
         Returns:
             AgentResult with natural language explanation
@@ -583,7 +591,8 @@ Your job is to:
                 sql=sql,
                 results=results,
                 columns=columns,
-                row_count=row_count
+                row_count=row_count,
+                on_token=on_token
             )
         else:
             # Use detailed explanation for smaller results
@@ -595,7 +604,8 @@ Your job is to:
                 results=results,
                 columns=columns,
                 row_count=row_count,
-                max_rows_for_context=max_rows_for_context
+                max_rows_for_context=max_rows_for_context,
+                on_token=on_token
             )
         
         tool_calls.append(tool_result)
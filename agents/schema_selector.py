@@ -8,6 +8,7 @@ Tools:
 3. select_columns - Select necessary columns from tables
 """
 from typing import Dict, Any, List, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
 import time
 
 from agents.base_agent import BaseAgent, BaseTool, AgentResult, ToolResult
@@ -368,12 +369,11 @@ Your job is to select the minimal set of tables and columns needed to answer a q
         
         # Step 3: Select columns for each table
         self.log(f"Selecting columns for {len(selected_tables)} tables...")
-        tables_with_columns = []
         
+        # Resolve tables first so the per-table LLM calls can run concurrently
+        table_jobs = []
         for table_info in selected_tables:
             table_name = table_info.get('name')
-            table_role = table_info.get('role', 'primary')
-            
             schema_table = self.schema.get_table_info(table_name)
             if not schema_table:
                 continue
@@ -387,24 +387,35 @@ Your job is to select the minimal set of tables and columns needed to answer a q
                 }
                 for col in schema_table.columns
             ]
-            
-            # Select relevant columns
-            cols_result = self.call_tool(
+            table_jobs.append((table_info, columns))
+        
+        def select_columns(job):
+            table_info, columns = job
+            return self.call_tool(
                 "select_columns",
-                table_name=table_name,
+                table_name=table_info.get('name'),
                 columns=columns,
                 question=question,
-                table_role=table_role
+                table_role=table_info.get('role', 'primary')
             )
+        
+        # Each call is network-bound, so overlap them; map() keeps table order
+        cols_results = []
+        if table_jobs:
+            with ThreadPoolExecutor(max_workers=min(4, len(table_jobs))) as executor:
+                cols_results = list(executor.map(select_columns, table_jobs))
+        
+        tables_with_columns = []
+        for (table_info, columns), cols_result in zip(table_jobs, cols_results):
             tool_calls.append(cols_result)
             total_tokens += cols_result.tokens_used
             
             selected_cols = cols_result.data.get('columns', []) if cols_result.success else [c['name'] for c in columns]
             
             tables_with_columns.append({
-                'table_name': table_name,
+                'table_name': table_info.get('name'),
                 'columns': selected_cols,
-                'role': table_role,
+                'role': table_info.get('role', 'primary'),
                 'reason': table_info.get('reason', ''),
                 'column_usage': cols_result.data.get('usage', {}) if cols_result.success else {}
             })
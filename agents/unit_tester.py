@@ -46,10 +46,10 @@ class GenerateUnitTestTool(BaseTool):
             num_tests: Number of unit tests to generate
         """
         # Format candidates for the prompt
-        candidates_text = ""
-        for i, cand in enumerate(candidates):
-            candidates_text += f"\n--- Candidate {i+1} ({cand.get('strategy', 'unknown')}) ---\n"
-            candidates_text += f"{cand.get('sql', 'N/A')}\n"
+        candidates_text = "".join(
+            f"\n--- Candidate {i+1} ({cand.get('strategy', 'unknown')}) ---\n{cand.get('sql', 'N/A')}\n"
+            for i, cand in enumerate(candidates)
+        )
         
         system_prompt = """You are a SQL testing expert.
 Generate unit tests that can differentiate between SQL query candidates.
@@ -153,20 +153,21 @@ class EvaluateTool(BaseTool):
             question: Original question for context
         """
         # Format candidates with execution results
-        candidates_text = ""
+        parts = []
         for i, cand in enumerate(candidates):
             sql = cand.get('sql', '')
             preview = cand.get('result_preview', {})
             
-            candidates_text += f"\n--- Candidate {i+1} ---\n"
-            candidates_text += f"SQL: {sql}\n"
-            candidates_text += f"Valid: {cand.get('is_valid', False)}\n"
+            parts.append(f"\n--- Candidate {i+1} ---\n")
+            parts.append(f"SQL: {sql}\n")
+            parts.append(f"Valid: {cand.get('is_valid', False)}\n")
             
             if preview:
-                candidates_text += f"Columns: {preview.get('columns', [])}\n"
-                candidates_text += f"Row count: {preview.get('row_count', 0)}\n"
+                parts.append(f"Columns: {preview.get('columns', [])}\n")
+                parts.append(f"Row count: {preview.get('row_count', 0)}\n")
                 if preview.get('sample_rows'):
-                    candidates_text += f"Sample: {preview['sample_rows'][:2]}\n"
+                    parts.append(f"Sample: {preview['sample_rows'][:2]}\n")
+        candidates_text = "".join(parts)
         
         system_prompt = """You are a SQL testing expert evaluating query candidates.
 For each candidate, determine if it passes the given unit test.
@@ -179,18 +180,21 @@ Consider:
 Be strict but fair in evaluation.
 Return your evaluation as JSON."""
 
+        # Every unit test for a question is evaluated against the same
+        # question and candidates, so they lead the prompt and form a shared
+        # prefix the provider can cache; only the test block differs
         user_content = f"""Evaluate these SQL candidates against the unit test:
 
 ORIGINAL QUESTION: {question}
 
+CANDIDATES:
+{candidates_text}
+
 UNIT TEST:
 - Description: {unit_test.get('test_description', '')}
 - Expected behavior: {unit_test.get('expected_behavior', '')}
 - Test type: {unit_test.get('test_type', 'general')}
 
-CANDIDATES:
-{candidates_text}
-
 For each candidate, determine if it PASSES or FAILS this test.
 
 Return JSON:
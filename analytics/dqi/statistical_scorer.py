@@ -204,25 +204,33 @@ class StatisticalScorer:
         if columns is None:
             columns = feature_df.columns.tolist()
         
+        columns = [col for col in dict.fromkeys(columns) if col in feature_df.columns]
+        if not columns:
+            # agg() on a frame with no columns raises instead of returning nothing
+            return {}
+        frame = feature_df[columns]
+        
+        # Whole-frame reductions: one pass for the moments and a single sort
+        # per column for all percentiles, instead of one call per statistic
+        counts = frame.count()
+        summary = frame.agg(["mean", "std", "min", "max"])
+        quantiles = frame.quantile([0.25, 0.50, 0.75, 0.90, 0.95])
+        
         baselines = {}
         for col in columns:
-            if col not in feature_df.columns:
-                continue
-            
-            values = feature_df[col].dropna()
-            if len(values) == 0:
+            if counts[col] == 0:
                 continue
             
             baselines[col] = {
-                "mean": float(values.mean()),
-                "std": float(values.std()) if len(values) > 1 else 0.0,
-                "min": float(values.min()),
-                "max": float(values.max()),
-                "p25": float(values.quantile(0.25)),
-                "p50": float(values.quantile(0.50)),
-                "p75": float(values.quantile(0.75)),
-                "p90": float(values.quantile(0.90)),
-                "p95": float(values.quantile(0.95)),
+                "mean": float(summary.at["mean", col]),
+                "std": float(summary.at["std", col]) if counts[col] > 1 else 0.0,
+                "min": float(summary.at["min", col]),
+                "max": float(summary.at["max", col]),
+                "p25": float(quantiles.at[0.25, col]),
+                "p50": float(quantiles.at[0.50, col]),
+                "p75": float(quantiles.at[0.75, col]),
+                "p90": float(quantiles.at[0.90, col]),
+                "p95": float(quantiles.at[0.95, col]),
             }
         
         return baselines
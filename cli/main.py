@@ -13,6 +13,7 @@ import typer
 from rich.console import Console
 from rich.table import Table
 from rich.panel import Panel
+from rich.markup import escape
 from rich.syntax import Syntax
 from rich.prompt import Prompt
 from rich.progress import Progress, SpinnerColumn, TextColumn
@@ -28,7 +29,11 @@ console = Console()
 
 
 @app.command()
-def setup():
+def setup(
+    clear_embed_cache: bool = typer.Option(
+        False, "--clear-embed-cache", help="Discard cached schema-description embeddings"
+    )
+):
     """
     Setup the database and preprocessing indices.
     Run this first before querying.
@@ -78,6 +83,10 @@ def setup():
     # Build preprocessing indices
     console.print("\n[bold]Building preprocessing indices...[/bold]")
     
+    if clear_embed_cache:
+        preprocessor.embedding_cache.clear()
+        console.print("[yellow]Cleared embedding cache[/yellow]")
+    
     if not preprocessor.load_cache():
         stats = preprocessor.preprocess(db_manager, schema_manager)
         console.print(f"[green]✓ Indexed {stats['total_values_indexed']} values[/green]")
@@ -215,6 +224,42 @@ def query(
     ))
 
 
+def _stream_explanation(pipeline, result):
+    """Print the result explanation as the LLM generates it and fold its tokens into the result"""
+    console.print("\n[bold yellow]💡 Answer[/bold yellow]")
+    streamed = []
+    
+    def on_token(text: str):
+        streamed.append(text)
+        console.print(text, end="", markup=False, highlight=False, soft_wrap=True)
+    
+    schema_context = result.ss_result.data.get('schema_text', '') if result.ss_result and result.ss_result.data else ''
+    re_result = pipeline.re_agent.execute(
+        question=result.question,
+        sql=result.sql,
+        execution_result=result.execution_result,
+        schema_context=schema_context,
+        on_token=on_token
+    )
+    result.re_result = re_result
+    result.total_tokens += re_result.tokens_used
+    
+    if streamed:
+        console.print()
+        # A stream that broke mid-answer is not retried, so say the text above is incomplete
+        if not re_result.success:
+            console.print(f"[yellow]\\[answer truncated: {escape(str(re_result.error))}][/yellow]")
+    elif re_result.success:
+        # Split queries are explained piecewise and combined, so print the result whole
+        console.print(Panel(
+            f"[white]{re_result.data.get('explanation', '')}[/white]",
+            border_style="yellow",
+            padding=(1, 2)
+        ))
+    else:
+        console.print(f"[yellow]Could not explain results: {re_result.error}[/yellow]")
+
+
 @app.command()
 def interactive():
     """
@@ -274,14 +319,14 @@ Just type your question to query the database!
                     console.print(f"[yellow]Unknown command: {cmd}[/yellow]")
                     continue
             
-            # Process query
+            # Process query; the explanation is streamed after the results are shown
             with console.status("Processing...", spinner="dots"):
                 result = pipeline.run(
                     question=question,
                     num_candidates=2,
                     num_unit_tests=3,
                     execute_result=True,
-                    explain_result=True
+                    explain_result=False
                 )
             
             if result.success and result.sql:
@@ -321,20 +366,16 @@ Just type your question to query the database!
                             padding=(1, 1)
                         ))
                         
-                        # Show explanation in interactive mode
-                        if result.explanation:
-                            console.print(Panel(
-                                f"[white]{result.explanation}[/white]",
-                                title="[bold yellow]💡 Answer[/bold yellow]",
-                                border_style="yellow",
-                                padding=(1, 2)
-                            ))
+                        # Stream the explanation so the answer starts appearing at once
+                        _stream_explanation(pipeline, result)
                     else:
                         console.print(Panel(
                             f"[bold]{row_count}[/bold] rows returned",
                             title="[bold green]📊 Query Results[/bold green]",
                             border_style="green"
                         ))
+                
+                console.print(f"[dim]⏱️  {result.total_time:.2f}s  •  🎫 {result.total_tokens:,} tokens[/dim]")
             else:
                 console.print(Panel(
                     f"[red]{result.error}[/red]",
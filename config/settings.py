@@ -45,7 +45,25 @@ AGENT_CONFIG = {
     "max_retries": 3,
     "temperature": 0.1,  # Low temperature for more deterministic outputs
     "top_candidates": 3,  # Number of SQL candidates to generate
+    # Client-side cap on LLM requests per minute across the process (0 = no cap)
+    "requests_per_minute": int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "0")),
 }
 
 # Schema cache settings
 SCHEMA_CACHE_PATH = os.path.join(os.path.dirname(__file__), "..", "cache", "schema_cache.json")
+
+# Embedding settings for the schema-description vector store
+EMBEDDING_CONFIG = {
+    "model": "all-MiniLM-L6-v2",
+    "batch_size": int(os.getenv("EMBED_BATCH_SIZE", "256")),  # Texts per encode() call
+    "cache_dir": os.getenv("CACHE_DIR"),  # Embedding cache location (defaults to preprocessing cache)
+    "dtype": os.getenv("EMBED_DTYPE", "fp32"),  # Encoder precision: fp32, fp16 (GPU only) or bf16
+}
+
+# MinHash LSH settings for the database-value index. More bands (fewer rows
+# per band) raise candidate recall at the cost of larger candidate sets.
+LSH_CONFIG = {
+    "num_perm": int(os.getenv("LSH_NUM_PERM", "128")),  # MinHash permutations
+    "num_bands": int(os.getenv("LSH_NUM_BANDS", "32")),  # Must divide num_perm
+    "threshold": float(os.getenv("LSH_THRESHOLD", "0.3")),  # Similarity cut-off
+}
@@ -1,12 +1,18 @@
 """
 Data loader to import Excel files from clinical trial studies into PostgreSQL
 """
+import io
 import os
 import re
+import importlib.util
+import multiprocessing
+import threading
+from functools import lru_cache
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 import pandas as pd
 from typing import List, Dict, Optional
 from pathlib import Path
-from sqlalchemy import text
+from psycopg2 import sql
 from rich.console import Console
 from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn
 
@@ -15,26 +21,87 @@ from database.connection import DatabaseManager
 
 console = Console()
 
+# The Rust calamine reader parses xlsx far faster than openpyxl; pandas uses it
+# when python-calamine is installed and pandas is new enough to know the
+# engine (2.2+), otherwise the default engine is kept
+_PANDAS_VERSION = tuple(int(part) for part in re.findall(r'\d+', pd.__version__)[:2])
+EXCEL_ENGINE = (
+    'calamine'
+    if _PANDAS_VERSION >= (2, 2) and importlib.util.find_spec('python_calamine')
+    else None
+)
+
+# File categories in priority order; the first category with a matching keyword wins
+FILE_CATEGORIES = {
+    'visit': ['visit', 'projection', 'tracker'],
+    'query': ['query', 'edrr'],
+    'safety': ['esae', 'safety', 'sae'],
+    'coding': ['coding', 'meddra', 'whodd'],
+    'lab': ['lab', 'missing_lab'],
+    'edc_metrics': ['edc', 'metrics'],
+    'forms': ['inactivated', 'forms', 'folders', 'records'],
+    'pages': ['missing_pages', 'page']
+}
+
+# One anchored lookahead per category, tried in order, so a single match()
+# reproduces the first-category-wins keyword scan
+_CATEGORY_PATTERN = re.compile(
+    '|'.join(
+        f"(?P<{category}>(?=.*?(?:{'|'.join(map(re.escape, keywords))})))"
+        for category, keywords in FILE_CATEGORIES.items()
+    ),
+    re.IGNORECASE | re.DOTALL
+)
+
+
+@lru_cache(maxsize=4096)
+def _categorize(filename: str) -> str:
+    match = _CATEGORY_PATTERN.match(filename)
+    return match.lastgroup if match else 'other'
+
+
+_SPECIAL_CHARS_PATTERN = re.compile(r'[^\w\s]')
+_WHITESPACE_PATTERN = re.compile(r'\s+')
+
+
+# Study workbooks repeat the same column headers, so most lookups are hits
+@lru_cache(maxsize=4096)
+def _sanitize_name(name: str) -> str:
+    # Remove special characters and replace spaces with underscores
+    sanitized = _SPECIAL_CHARS_PATTERN.sub('', name)
+    sanitized = _WHITESPACE_PATTERN.sub('_', sanitized)
+    sanitized = sanitized.lower().strip('_')
+    # Ensure doesn't start with number
+    if sanitized and sanitized[0].isdigit():
+        sanitized = 'col_' + sanitized
+    # Truncate to 63 chars (PostgreSQL limit)
+    return sanitized[:63] if sanitized else 'unnamed_column'
+
+
+_STUDY_PATTERN = re.compile(r'Study\s*(\d+)', re.IGNORECASE)
+_STUDY_PREFIX_PATTERN = re.compile(r'^Study\s*\d+[_\s]*', re.IGNORECASE)
+_UPDATED_SUFFIX_PATTERN = re.compile(r'_updated$', re.IGNORECASE)
+_DATE_SUFFIX_PATTERN = re.compile(
+    r'_\d{1,2}\s*(NOV|DEC|JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT)\s*\d{4}', re.IGNORECASE
+)
+
 
 class ClinicalDataLoader:
     """Loads clinical trial Excel data into PostgreSQL"""
     
-    def __init__(self, data_root: str = None, db_manager: DatabaseManager = None):
+    def __init__(self, data_root: str = None, db_manager: DatabaseManager = None,
+                 skip_uncategorized: bool = False):
         self.data_root = Path(data_root or DATA_ROOT_PATH)
         self.db = db_manager or DatabaseManager()
         self.loaded_tables = []
+        # Skip workbooks whose filename matches no FILE_CATEGORIES keyword
+        # (category 'other') without opening them. Saves parsing time on
+        # unfamiliar data dumps at the cost of not loading those files.
+        self.skip_uncategorized = skip_uncategorized
         
     def sanitize_name(self, name: str) -> str:
         """Convert name to valid PostgreSQL identifier"""
-        # Remove special characters and replace spaces with underscores
-        sanitized = re.sub(r'[^\w\s]', '', str(name))
-        sanitized = re.sub(r'\s+', '_', sanitized)
-        sanitized = sanitized.lower().strip('_')
-        # Ensure doesn't start with number
-        if sanitized and sanitized[0].isdigit():
-            sanitized = 'col_' + sanitized
-        # Truncate to 63 chars (PostgreSQL limit)
-        return sanitized[:63] if sanitized else 'unnamed_column'
+        return _sanitize_name(str(name))
     
     def sanitize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
         """Sanitize all column names in DataFrame"""
@@ -58,18 +125,25 @@ class ClinicalDataLoader:
         """Find all Excel files in the data directory"""
         excel_files = []
         
-        for study_folder in self.data_root.iterdir():
-            if study_folder.is_dir() and 'CPID' in study_folder.name:
+        # scandir entries carry the file type from the directory listing, so
+        # folders and files are filtered without a stat call or Path per entry
+        with os.scandir(self.data_root) as study_folders:
+            for study_folder in study_folders:
+                if not (study_folder.is_dir() and 'CPID' in study_folder.name):
+                    continue
                 # Extract study number
-                study_match = re.search(r'Study\s*(\d+)', study_folder.name, re.IGNORECASE)
+                study_match = _STUDY_PATTERN.search(study_folder.name)
                 study_num = study_match.group(1) if study_match else 'unknown'
                 
-                for file_path in study_folder.glob('*.xlsx'):
-                    if not file_path.name.startswith('~$'):  # Skip temp files
+                with os.scandir(study_folder.path) as entries:
+                    for entry in entries:
+                        name = entry.name
+                        if not name.endswith('.xlsx') or name.startswith('~$'):  # Skip temp files
+                            continue
                         excel_files.append({
-                            'path': file_path,
+                            'path': Path(entry.path),
                             'study_number': study_num,
-                            'filename': file_path.stem
+                            'filename': name[:-len('.xlsx')]
                         })
         
         return excel_files
@@ -81,9 +155,9 @@ class ClinicalDataLoader:
         
         # Extract meaningful part of filename
         # Remove study prefix and common suffixes
-        name = re.sub(r'^Study\s*\d+[_\s]*', '', filename, flags=re.IGNORECASE)
-        name = re.sub(r'_updated$', '', name, flags=re.IGNORECASE)
-        name = re.sub(r'_\d{1,2}\s*(NOV|DEC|JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT)\s*\d{4}', '', name, flags=re.IGNORECASE)
+        name = _STUDY_PREFIX_PATTERN.sub('', filename)
+        name = _UPDATED_SUFFIX_PATTERN.sub('', name)
+        name = _DATE_SUFFIX_PATTERN.sub('', name)
         
         # Sanitize
         table_name = self.sanitize_name(name)
@@ -93,23 +167,7 @@ class ClinicalDataLoader:
     
     def categorize_file(self, filename: str) -> str:
         """Categorize file based on its name"""
-        filename_lower = filename.lower()
-        
-        categories = {
-            'visit': ['visit', 'projection', 'tracker'],
-            'query': ['query', 'edrr'],
-            'safety': ['esae', 'safety', 'sae'],
-            'coding': ['coding', 'meddra', 'whodd'],
-            'lab': ['lab', 'missing_lab'],
-            'edc_metrics': ['edc', 'metrics'],
-            'forms': ['inactivated', 'forms', 'folders', 'records'],
-            'pages': ['missing_pages', 'page']
-        }
-        
-        for category, keywords in categories.items():
-            if any(kw in filename_lower for kw in keywords):
-                return category
-        return 'other'
+        return _categorize(filename)
     
     def load_excel_file(self, file_info: Dict, sheet_name: Optional[str] = None) -> Dict[str, pd.DataFrame]:
         """Load Excel file, handling multiple sheets"""
@@ -117,27 +175,28 @@ class ClinicalDataLoader:
         dfs = {}
         
         try:
-            # Read all sheets
-            xlsx = pd.ExcelFile(file_path)
-            sheets_to_load = [sheet_name] if sheet_name else xlsx.sheet_names
-            
-            for sheet in sheets_to_load:
-                try:
-                    df = pd.read_excel(xlsx, sheet_name=sheet)
-                    
-                    # Skip empty dataframes
-                    if df.empty or len(df.columns) == 0:
-                        continue
-                    
-                    # Clean the dataframe
-                    df = self.clean_dataframe(df)
-                    
-                    if not df.empty:
-                        sheet_suffix = '' if len(sheets_to_load) == 1 else f"_{self.sanitize_name(sheet)}"
-                        dfs[sheet_suffix] = df
+            # Open the workbook once for all of its sheets (the openpyxl
+            # engine loads it read-only/data-only) and release it promptly
+            with pd.ExcelFile(file_path, engine=EXCEL_ENGINE) as xlsx:
+                sheets_to_load = [sheet_name] if sheet_name else xlsx.sheet_names
+                
+                for sheet in sheets_to_load:
+                    try:
+                        df = xlsx.parse(sheet_name=sheet)
+                        
+                        # Skip empty dataframes
+                        if df.empty or len(df.columns) == 0:
+                            continue
+                        
+                        # Clean the dataframe
+                        df = self.clean_dataframe(df)
                         
-                except Exception as e:
-                    console.print(f"[yellow]Warning: Could not load sheet '{sheet}': {e}[/yellow]")
+                        if not df.empty:
+                            sheet_suffix = '' if len(sheets_to_load) == 1 else f"_{self.sanitize_name(sheet)}"
+                            dfs[sheet_suffix] = df
+                            
+                    except Exception as e:
+                        console.print(f"[yellow]Warning: Could not load sheet '{sheet}': {e}[/yellow]")
                     
         except Exception as e:
             console.print(f"[red]Error loading file {file_path}: {e}[/red]")
@@ -162,84 +221,175 @@ class ClinicalDataLoader:
                 df[col] = df[col].astype(str).replace('NaT', None)
             # Handle mixed types - convert to string
             elif df[col].dtype == 'object':
-                df[col] = df[col].apply(lambda x: str(x) if pd.notna(x) else None)
+                values = df[col]
+                df[col] = values.map(str).where(values.notna(), None)
         
         return df
     
     def create_table_from_df(self, df: pd.DataFrame, table_name: str, if_exists: str = 'replace'):
         """Create table in PostgreSQL from DataFrame"""
         try:
-            df.to_sql(
-                table_name,
-                self.db.engine,
-                if_exists=if_exists,
-                index=False,
-                method='multi',
-                chunksize=1000
-            )
+            # pandas only creates the (empty) table; rows are streamed with
+            # COPY, which is far faster than multi-row INSERT statements.
+            # Both run in one transaction, so a failed COPY is rolled back.
+            buffer = io.StringIO()
+            df.to_csv(buffer, index=False, header=False, na_rep='\\N')
+            buffer.seek(0)
+            
+            with self.db.engine.begin() as conn:
+                df.head(0).to_sql(table_name, conn, if_exists=if_exists, index=False)
+                copy_query = sql.SQL("COPY {} FROM STDIN WITH (FORMAT csv, NULL '\\N')").format(
+                    sql.Identifier(table_name)
+                )
+                with conn.connection.cursor() as cursor:
+                    cursor.copy_expert(copy_query, buffer)
             return True
         except Exception as e:
             console.print(f"[red]Error creating table {table_name}: {e}[/red]")
             return False
     
-    def load_all_studies(self, progress_callback=None) -> Dict[str, List[str]]:
-        """Load all study data into PostgreSQL"""
+    def load_all_studies(self, progress_callback=None, max_workers: Optional[int] = None) -> Dict[str, List[str]]:
+        """
+        Load all study data into PostgreSQL.
+        
+        Excel parsing is CPU-bound, so files are parsed in a process pool of
+        `max_workers` (default: CPU count); parsed tables are written by a
+        small thread pool, since COPY spends its time waiting on PostgreSQL.
+        """
         excel_files = self.discover_excel_files()
         results = {'success': [], 'failed': []}
+        max_workers = max_workers or os.cpu_count() or 1
         
         console.print(f"\n[bold blue]Found {len(excel_files)} Excel files to process[/bold blue]\n")
         
+        if self.skip_uncategorized:
+            # Categorization only needs the filename, so decide before parsing
+            categorized = [f for f in excel_files if self.categorize_file(f['filename']) != 'other']
+            if len(categorized) < len(excel_files):
+                console.print(f"[yellow]Skipping {len(excel_files) - len(categorized)} uncategorized files[/yellow]\n")
+            excel_files = categorized
+        
+        n_writers = max(1, min(4, len(excel_files)))
+        # Parsed workbooks waiting for or being written; when full, the
+        # loader stops draining (and submitting) parses until a writer frees
+        # a slot, so parsing can't run ahead and pile up DataFrames
+        write_slots = threading.BoundedSemaphore(n_writers * 2)
+        
         with Progress(
             SpinnerColumn(),
             TextColumn("[progress.description]{task.description}"),
             BarColumn(),
             TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
             console=console
-        ) as progress:
+        ) as progress, ProcessPoolExecutor(
+            max_workers=max_workers,
+            # Spawned workers behave the same on every platform and never
+            # inherit this process's database connections
+            mp_context=multiprocessing.get_context('spawn')
+        ) as executor, ThreadPoolExecutor(
+            # Each writer holds its own pooled connection, so stay within
+            # SQLAlchemy's default pool size of 5
+            max_workers=n_writers
+        ) as writer:
             task = progress.add_task("Loading data...", total=len(excel_files))
             
-            for file_info in excel_files:
-                file_name = file_info['filename']
-                progress.update(task, description=f"Loading: {file_name[:40]}...")
-                
-                # Load Excel file (may have multiple sheets)
-                dfs = self.load_excel_file(file_info)
-                
-                for sheet_suffix, df in dfs.items():
-                    table_name = self.infer_table_name(file_info) + sheet_suffix
-                    table_name = table_name[:63]  # PostgreSQL limit
-                    
-                    # Add metadata columns
-                    df['_study_number'] = file_info['study_number']
-                    df['_source_file'] = file_name
-                    df['_category'] = self.categorize_file(file_name)
+            def on_written(_):
+                write_slots.release()
+                progress.advance(task)
+            
+            # Keep one parse per worker in flight rather than queueing every
+            # file up front, since finished parses hold their DataFrames
+            pending_files = iter(excel_files)
+            futures = {}
+            write_futures = []
+            
+            def submit_parses():
+                while len(futures) < max_workers:
+                    file_info = next(pending_files, None)
+                    if file_info is None:
+                        return
+                    futures[executor.submit(_parse_excel_file, file_info)] = file_info
+            
+            # Hand each file to a writer as soon as it is parsed, so a slow
+            # workbook does not hold up inserts for the ones behind it.
+            # Popping the future drops the parse result once handed off, and
+            # a finished write keeps only its table summaries, so memory
+            # holds only the files in flight, not the whole corpus.
+            submit_parses()
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_info = futures.pop(future)
+                    dfs = future.result()
+                    progress.update(task, description=f"Loading: {file_info['filename'][:40]}...")
                     
-                    if self.create_table_from_df(df, table_name):
+                    write_slots.acquire()
+                    write_future = writer.submit(self._write_file_tables, file_info, dfs)
+                    write_future.add_done_callback(on_written)
+                    write_futures.append(write_future)
+                    del dfs
+                submit_parses()
+            
+            for write_future in as_completed(write_futures):
+                for table_name, table_info in write_future.result():
+                    if table_info is not None:
                         results['success'].append(table_name)
-                        self.loaded_tables.append({
-                            'table_name': table_name,
-                            'study': file_info['study_number'],
-                            'category': self.categorize_file(file_name),
-                            'row_count': len(df),
-                            'columns': list(df.columns)
-                        })
+                        self.loaded_tables.append(table_info)
                     else:
                         results['failed'].append(table_name)
-                
-                progress.advance(task)
         
         # Create metadata table
         self._create_metadata_table()
         
         return results
     
+    def _write_file_tables(self, file_info: Dict, dfs: Dict[str, pd.DataFrame]) -> List[tuple]:
+        """
+        Write one parsed workbook's sheets to PostgreSQL.
+        
+        Returns (table_name, table_info) pairs, with table_info None for
+        tables that failed to load.
+        """
+        file_name = file_info['filename']
+        written = []
+        
+        # Per-file values shared by every sheet
+        base_table_name = self.infer_table_name(file_info)
+        category = self.categorize_file(file_name)
+        
+        for sheet_suffix, df in dfs.items():
+            table_name = base_table_name + sheet_suffix
+            table_name = table_name[:63]  # PostgreSQL limit
+            
+            # Add metadata columns
+            df['_study_number'] = file_info['study_number']
+            df['_source_file'] = file_name
+            df['_category'] = category
+            
+            if self.create_table_from_df(df, table_name):
+                written.append((table_name, {
+                    'table_name': table_name,
+                    'study': file_info['study_number'],
+                    'category': category,
+                    'row_count': len(df),
+                    'columns': list(df.columns)
+                }))
+            else:
+                written.append((table_name, None))
+        
+        return written
+    
     def _create_metadata_table(self):
         """Create a metadata table with information about all loaded tables"""
         if not self.loaded_tables:
             return
             
-        metadata_df = pd.DataFrame(self.loaded_tables)
-        metadata_df['columns'] = metadata_df['columns'].apply(lambda x: ','.join(x))
+        # Build the frame column by column instead of from a list of row dicts
+        fields = ('table_name', 'study', 'category', 'row_count')
+        metadata_df = pd.DataFrame({
+            field: [t[field] for t in self.loaded_tables] for field in fields
+        })
+        metadata_df['columns'] = [','.join(t['columns']) for t in self.loaded_tables]
         
         self.create_table_from_df(metadata_df, '_table_metadata', if_exists='replace')
         console.print("\n[green]Created metadata table: _table_metadata[/green]")
@@ -271,6 +421,11 @@ class ClinicalDataLoader:
         console.print(f"[blue]Query tables found: {len(query_tables)}[/blue]")
 
 
+def _parse_excel_file(file_info: Dict) -> Dict[str, pd.DataFrame]:
+    """Process-pool worker: read and clean every sheet of one Excel file"""
+    return ClinicalDataLoader().load_excel_file(file_info)
+
+
 def create_database_if_not_exists():
     """Create the database if it doesn't exist"""
     from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
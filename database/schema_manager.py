@@ -2,15 +2,16 @@
 Schema Manager - Extracts and manages database schema information
 with token optimization for efficient context building
 """
-import json
 import os
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass, asdict
+from collections import defaultdict
 from pathlib import Path
 import tiktoken
 
 from database.connection import DatabaseManager, db_manager
 from config.settings import TOKEN_LIMITS, SCHEMA_CACHE_PATH
+from utils.json_io import read_json, write_json
 
 
 @dataclass
@@ -86,35 +87,61 @@ class SchemaManager:
         self.db = db or db_manager
         self.tables: Dict[str, TableInfo] = {}
         self.tokenizer = tiktoken.get_encoding("cl100k_base")
+        # Token counts of rendered table strings; the same DDL is measured on
+        # every question, so encode each distinct string only once
+        self._token_counts: Dict[str, int] = {}
+        # Tables grouped by category / study number, built on first lookup
+        self._by_category: Optional[Dict[str, List[TableInfo]]] = None
+        self._by_study: Optional[Dict[str, List[TableInfo]]] = None
         self._load_cache()
     
     def count_tokens(self, text: str) -> int:
         """Count tokens in text"""
         return len(self.tokenizer.encode(text))
     
+    def _count_tokens_cached(self, text: str) -> int:
+        count = self._token_counts.get(text)
+        if count is None:
+            count = self._token_counts[text] = self.count_tokens(text)
+        return count
+    
+    def _invalidate_indexes(self):
+        """Drop the category/study indexes after self.tables changes"""
+        self._by_category = None
+        self._by_study = None
+    
+    def _build_indexes(self):
+        by_category = defaultdict(list)
+        by_study = defaultdict(list)
+        for table_info in self.tables.values():
+            by_category[table_info.category].append(table_info)
+            by_study[table_info.study_number].append(table_info)
+        self._by_category = dict(by_category)
+        self._by_study = dict(by_study)
+    
     def _load_cache(self):
         """Load schema from cache if available"""
         cache_path = Path(SCHEMA_CACHE_PATH)
         if cache_path.exists():
             try:
-                with open(cache_path, 'r') as f:
-                    data = json.load(f)
-                    for table_name, table_data in data.items():
-                        columns = [ColumnInfo(**col) for col in table_data['columns']]
-                        self.tables[table_name] = TableInfo(
-                            name=table_data['name'],
-                            columns=columns,
-                            row_count=table_data.get('row_count', 0),
-                            primary_keys=table_data.get('primary_keys'),
-                            foreign_keys=table_data.get('foreign_keys'),
-                            category=table_data.get('category', ''),
-                            study_number=table_data.get('study_number', ''),
-                            description=table_data.get('description', '')
-                        )
+                data = read_json(cache_path)
+                for table_name, table_data in data.items():
+                    columns = [ColumnInfo(**col) for col in table_data['columns']]
+                    self.tables[table_name] = TableInfo(
+                        name=table_data['name'],
+                        columns=columns,
+                        row_count=table_data.get('row_count', 0),
+                        primary_keys=table_data.get('primary_keys'),
+                        foreign_keys=table_data.get('foreign_keys'),
+                        category=table_data.get('category', ''),
+                        study_number=table_data.get('study_number', ''),
+                        description=table_data.get('description', '')
+                    )
                 # Apply descriptions from config file
                 self._apply_descriptions()
             except Exception as e:
                 print(f"Warning: Could not load schema cache: {e}")
+            self._invalidate_indexes()
     
     def _apply_descriptions(self):
         """Apply table and column descriptions from config/table_descriptions.json"""
@@ -123,8 +150,7 @@ class SchemaManager:
             return
         
         try:
-            with open(desc_path, 'r') as f:
-                descriptions = json.load(f)
+            descriptions = read_json(desc_path)
             
             for table_name, desc_info in descriptions.items():
                 if table_name in self.tables:
@@ -157,14 +183,15 @@ class SchemaManager:
                 'description': table_info.description
             }
         
-        with open(cache_path, 'w') as f:
-            json.dump(data, f, indent=2, default=str)
+        write_json(cache_path, data)
     
     def refresh_schema(self, include_samples: bool = True):
         """Refresh schema information from database"""
         self.tables = {}
+        self._invalidate_indexes()
         
         table_names = self.db.get_all_tables()
+        row_counts = self._loaded_row_counts() if '_table_metadata' in table_names else {}
         
         for table_name in table_names:
             # Handle metadata tables specially
@@ -176,6 +203,7 @@ class SchemaManager:
             
             # Get sample values if requested
             samples = {}
+            sample_rows = None
             if include_samples:
                 try:
                     sample_rows = self.db.get_table_sample(table_name, limit=5)
@@ -202,7 +230,12 @@ class SchemaManager:
             category = ""
             study_number = ""
             try:
-                meta_sample = self.db.get_table_sample(table_name, limit=1)
+                # The value samples already hold the first row, so only query
+                # for it when they were skipped or failed
+                if sample_rows is None:
+                    meta_sample = self.db.get_table_sample(table_name, limit=1)
+                else:
+                    meta_sample = sample_rows[:1]
                 if meta_sample:
                     category = meta_sample[0].get('_category', '')
                     study_number = meta_sample[0].get('_study_number', '')
@@ -212,7 +245,10 @@ class SchemaManager:
             self.tables[table_name] = TableInfo(
                 name=table_name,
                 columns=columns,
-                row_count=self.db.get_table_row_count(table_name),
+                row_count=(
+                    row_counts[table_name] if table_name in row_counts
+                    else self.db.get_table_row_count(table_name)
+                ),
                 primary_keys=self.db.get_primary_keys(table_name),
                 foreign_keys=self.db.get_foreign_keys(table_name),
                 category=category,
@@ -222,6 +258,19 @@ class SchemaManager:
         self._save_cache()
         return len(self.tables)
     
+    def _loaded_row_counts(self) -> Dict[str, int]:
+        """
+        Row counts recorded by the data loader in `_table_metadata`.
+        
+        One query replaces a COUNT(*) (a full table scan) per study table;
+        tables missing from the metadata are still counted directly.
+        """
+        try:
+            rows = self.db.execute_query("SELECT table_name, row_count FROM _table_metadata")
+        except Exception:
+            return {}
+        return {row['table_name']: int(row['row_count']) for row in rows}
+    
     def _add_metadata_table(self, table_name: str):
         """Add metadata/system tables with proper descriptions"""
         # Define descriptions for known metadata tables
@@ -248,6 +297,7 @@ class SchemaManager:
             category='metadata',
             description=metadata_descriptions.get(table_name, 'System metadata table')
         )
+        self._invalidate_indexes()
     
     def get_table_info(self, table_name: str) -> Optional[TableInfo]:
         """Get information for a specific table"""
@@ -259,11 +309,15 @@ class SchemaManager:
     
     def get_tables_by_category(self, category: str) -> List[TableInfo]:
         """Get tables filtered by category"""
-        return [t for t in self.tables.values() if t.category == category]
+        if self._by_category is None:
+            self._build_indexes()
+        return list(self._by_category.get(category, ()))
     
     def get_tables_by_study(self, study_number: str) -> List[TableInfo]:
         """Get tables for a specific study"""
-        return [t for t in self.tables.values() if t.study_number == study_number]
+        if self._by_study is None:
+            self._build_indexes()
+        return list(self._by_study.get(study_number, ()))
     
     def search_columns(self, search_term: str) -> List[Dict]:
         """Search for columns by name across all tables"""
@@ -332,7 +386,7 @@ class SchemaManager:
         # Header
         header = "-- DATABASE SCHEMA --\n"
         context_parts.append(header)
-        current_tokens += self.count_tokens(header)
+        current_tokens += self._count_tokens_cached(header)
         
         # Add relevant tables with appropriate detail level
         for table_name in relevant_tables:
@@ -348,13 +402,13 @@ class SchemaManager:
             else:  # compact
                 table_str = table_info.to_compact()
             
-            table_tokens = self.count_tokens(table_str)
+            table_tokens = self._count_tokens_cached(table_str)
             
             # Check if we can fit this table
             if current_tokens + table_tokens > max_tokens:
                 # Try compact version
                 compact_str = table_info.to_compact()
-                compact_tokens = self.count_tokens(compact_str)
+                compact_tokens = self._count_tokens_cached(compact_str)
                 
                 if current_tokens + compact_tokens <= max_tokens:
                     context_parts.append(compact_str)
@@ -374,20 +428,24 @@ class SchemaManager:
         relationships = []
         
         # Common linking columns in clinical data
-        link_columns = ['subject_id', 'site_id', 'study_number', 'patient_id', 'visit_id']
+        link_columns = {'subject_id', 'site_id', 'study_number', 'patient_id', 'visit_id'}
         
-        for table_name, table_info in self.tables.items():
-            table_cols = set(c.name.lower() for c in table_info.columns)
+        # Lowercase each table's columns once, keeping only the linking ones,
+        # instead of rebuilding the other table's column set for every pair
+        table_links = {
+            table_name: {c.name.lower() for c in table_info.columns} & link_columns
+            for table_name, table_info in self.tables.items()
+        }
+        
+        for table_name, links in table_links.items():
+            if not links:
+                continue
             
-            for other_table, other_info in self.tables.items():
+            for other_table, other_links in table_links.items():
                 if table_name == other_table:
                     continue
-                    
-                other_cols = set(c.name.lower() for c in other_info.columns)
                 
-                # Find common columns
-                common = table_cols.intersection(other_cols)
-                link_cols = common.intersection(set(link_columns))
+                link_cols = links & other_links
                 
                 if link_cols:
                     relationships.append({
@@ -5,17 +5,30 @@ This module handles:
 1. LSH (Locality Sensitive Hashing) indexing for database values - for entity retrieval
 2. Vector database for schema descriptions - for context retrieval
 """
-import os
-import json
 import pickle
 import hashlib
+import heapq
+import sqlite3
+from array import array
+from functools import lru_cache, partial
+from itertools import chain
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional, Set, Tuple
 from pathlib import Path
 from dataclasses import dataclass
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 import re
+import threading
 
-from config.settings import DATABASE_CONFIG
+import numpy as np
+
+from config.settings import DATABASE_CONFIG, EMBEDDING_CONFIG, LSH_CONFIG
+
+try:
+    from numba import njit
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
 
 
 @dataclass
@@ -27,34 +40,90 @@ class ValueIndex:
     data_type: str
     
 
+_MINHASH_PRIME = 2**31 - 1
+
+
+@lru_cache(maxsize=65536)
+def _shingle_hash(shingle: bytes) -> int:
+    """MD5-derived integer for a UTF-8 shingle (cached: values share most 3-grams)"""
+    return int.from_bytes(hashlib.md5(shingle).digest(), 'big') % _MINHASH_PRIME
+
+
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _minhash_signatures(hashes, offsets, a, b, prime):
+        """
+        min over shingles of (a*h + b) mod p for every permutation, one row per
+        value; value i owns hashes[offsets[i]:offsets[i + 1]]
+        """
+        signatures = np.zeros((len(offsets) - 1, len(a)), dtype=np.int64)
+        for row in range(len(offsets) - 1):
+            if offsets[row] == offsets[row + 1]:
+                continue
+            for k in range(len(a)):
+                lowest = prime
+                for i in range(offsets[row], offsets[row + 1]):
+                    value = (a[k] * hashes[i] + b[k]) % prime
+                    if value < lowest:
+                        lowest = value
+                signatures[row, k] = lowest
+        return signatures
+
+    # Compile once at import so the first insert does not pay for it
+    _minhash_signatures(np.ones(1, dtype=np.int64), np.array([0, 1], dtype=np.int64),
+                        np.ones(1, dtype=np.int64), np.zeros(1, dtype=np.int64), _MINHASH_PRIME)
+
+
 class MinHashLSH:
     """
     Locality Sensitive Hashing using MinHash for approximate string matching.
     Used for fast entity retrieval from database values.
     """
     
-    def __init__(self, num_perm: int = 128, threshold: float = 0.5):
+    def __init__(self, num_perm: int = 128, threshold: float = 0.5, num_bands: int = 32):
         """
         Args:
             num_perm: Number of permutations for MinHash
             threshold: Similarity threshold for LSH
+            num_bands: Number of LSH bands (must divide num_perm)
         """
+        if num_perm % num_bands:
+            raise ValueError(f"num_bands ({num_bands}) must divide num_perm ({num_perm})")
+        
         self.num_perm = num_perm
         self.threshold = threshold
-        self.hash_tables: Dict[int, Dict[int, Set[int]]] = {}
         self.values: List[ValueIndex] = []
         
         # Calculate number of bands and rows for LSH
         # b * r = num_perm, threshold ≈ (1/b)^(1/r)
-        self.num_bands = 32
+        self.num_bands = num_bands
         self.rows_per_band = num_perm // self.num_bands
         
+        # One bucket table per band, pre-allocated so add() is a single lookup.
+        # Buckets are compact uint32 arrays of value indices (partial keeps the
+        # factory picklable for the preprocessing cache).
+        self.hash_tables: List[Dict[int, array]] = [
+            defaultdict(partial(array, 'I')) for _ in range(self.num_bands)
+        ]
+        
         # Generate random hash coefficients
         import random
         random.seed(42)
         self.a_coeffs = [random.randint(1, 2**31 - 1) for _ in range(num_perm)]
         self.b_coeffs = [random.randint(0, 2**31 - 1) for _ in range(num_perm)]
-        self.prime = 2**31 - 1
+        self.prime = _MINHASH_PRIME
+        self._specialize()
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Indexes pickled before the coefficient arrays existed
+        if '_a' not in state:
+            self._specialize()
+    
+    def _specialize(self):
+        """Fold the hash coefficients into int64 arrays used by _minhash"""
+        self._a = np.array(self.a_coeffs, dtype=np.int64)
+        self._b = np.array(self.b_coeffs, dtype=np.int64)
     
     def _get_shingles(self, text: str, k: int = 3) -> Set[str]:
         """Get k-shingles (character n-grams) from text"""
@@ -63,20 +132,37 @@ class MinHashLSH:
             return {text}
         return {text[i:i+k] for i in range(len(text) - k + 1)}
     
-    def _minhash(self, shingles: Set[str]) -> List[int]:
-        """Compute MinHash signature for a set of shingles"""
-        signature = [float('inf')] * self.num_perm
+    def _get_shingle_bytes(self, text: str, k: int = 3) -> Set[bytes]:
+        """
+        UTF-8 encoded k-shingles of text, as hashed by _minhash.
         
-        for shingle in shingles:
-            # Hash the shingle
-            h = int(hashlib.md5(shingle.encode()).hexdigest(), 16)
-            
-            # Update signature with min hash for each permutation
-            for i in range(self.num_perm):
-                hash_val = (self.a_coeffs[i] * h + self.b_coeffs[i]) % self.prime
-                signature[i] = min(signature[i], hash_val)
+        ASCII text (nearly every database value) is encoded once and sliced
+        as bytes, which is cheaper than slicing str and encoding each
+        shingle; the bytes are the same either way.
+        """
+        text = text.lower().strip()
+        data = text.encode('utf-8')
+        if len(data) != len(text):
+            # Multi-byte characters: shingles must stay whole characters
+            return {shingle.encode('utf-8') for shingle in self._get_shingles(text, k)}
+        if len(data) < k:
+            return {data}
+        return {data[i:i+k] for i in range(len(data) - k + 1)}
+    
+    def _minhash(self, shingles: Set[bytes]) -> List[int]:
+        """Compute MinHash signature for a set of shingles"""
+        if not shingles:
+            return [0] * self.num_perm
         
-        return [int(x) if x != float('inf') else 0 for x in signature]
+        # (a*h + b) mod p == (a*(h mod p) + b) mod p, and with h mod p < 2^31
+        # every product fits in int64, so all permutations run as one array op
+        hashes = np.fromiter(map(_shingle_hash, shingles), dtype=np.int64, count=len(shingles))
+        if _NUMBA_AVAILABLE:
+            # Fused loop: no (shingles x permutations) temporaries
+            offsets = np.array([0, len(hashes)], dtype=np.int64)
+            return _minhash_signatures(hashes, offsets, self._a, self._b, self.prime)[0].tolist()
+        signature = (np.outer(hashes, self._a) + self._b) % self.prime
+        return signature.min(axis=0).tolist()
     
     def _get_band_hashes(self, signature: List[int]) -> List[int]:
         """Get hash for each band of the signature"""
@@ -90,21 +176,38 @@ class MinHashLSH:
     
     def add(self, value_index: ValueIndex):
         """Add a value to the LSH index"""
+        # Compute MinHash signature
+        shingles = self._get_shingle_bytes(value_index.value)
+        self._insert(value_index, self._minhash(shingles))
+    
+    def add_batch(self, value_indexes: List[ValueIndex]):
+        """Add many values, computing their MinHash signatures in one call"""
+        if not _NUMBA_AVAILABLE:
+            for value_index in value_indexes:
+                self.add(value_index)
+            return
+        
+        shingle_sets = [self._get_shingle_bytes(v.value) for v in value_indexes]
+        offsets = np.zeros(len(shingle_sets) + 1, dtype=np.int64)
+        np.cumsum([len(shingles) for shingles in shingle_sets], out=offsets[1:])
+        hashes = np.fromiter(
+            map(_shingle_hash, chain.from_iterable(shingle_sets)),
+            dtype=np.int64,
+            count=int(offsets[-1])
+        )
+        signatures = _minhash_signatures(hashes, offsets, self._a, self._b, self.prime)
+        
+        for value_index, signature in zip(value_indexes, signatures.tolist()):
+            self._insert(value_index, signature)
+    
+    def _insert(self, value_index: ValueIndex, signature: List[int]):
         idx = len(self.values)
         self.values.append(value_index)
-        
-        # Compute MinHash signature
-        shingles = self._get_shingles(value_index.value)
-        signature = self._minhash(shingles)
         band_hashes = self._get_band_hashes(signature)
         
         # Add to hash tables
-        for band_idx, band_hash in enumerate(band_hashes):
-            if band_idx not in self.hash_tables:
-                self.hash_tables[band_idx] = {}
-            if band_hash not in self.hash_tables[band_idx]:
-                self.hash_tables[band_idx][band_hash] = set()
-            self.hash_tables[band_idx][band_hash].add(idx)
+        for table, band_hash in zip(self.hash_tables, band_hashes):
+            table[band_hash].append(idx)
     
     def query(self, text: str, top_k: int = 10) -> List[Tuple[ValueIndex, float]]:
         """
@@ -118,14 +221,14 @@ class MinHashLSH:
             List of (ValueIndex, similarity_score) tuples
         """
         # Compute query signature
-        shingles = self._get_shingles(text)
+        shingles = self._get_shingle_bytes(text)
         signature = self._minhash(shingles)
         band_hashes = self._get_band_hashes(signature)
         
         # Find candidate matches from hash tables
         candidates = set()
         for band_idx, band_hash in enumerate(band_hashes):
-            candidates.update(self.hash_tables[band_idx].get(band_hash, set()))
+            candidates.update(self.hash_tables[band_idx].get(band_hash, ()))
         
         # Compute actual similarity for candidates
         results = []
@@ -135,9 +238,8 @@ class MinHashLSH:
             if similarity >= self.threshold * 0.5:  # Lower threshold for candidates
                 results.append((value_idx, similarity))
         
-        # Sort by similarity and return top_k
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
+        # Partial selection of the top_k instead of sorting every candidate
+        return heapq.nlargest(top_k, results, key=lambda x: x[1])
     
     def _compute_similarity(self, text1: str, text2: str) -> float:
         """Compute Jaccard similarity between two texts"""
@@ -153,16 +255,8 @@ class MinHashLSH:
         return intersection / union if union > 0 else 0.0
 
 
-def edit_distance(s1: str, s2: str) -> int:
-    """Compute Levenshtein edit distance between two strings"""
-    s1, s2 = s1.lower(), s2.lower()
-    
-    if len(s1) < len(s2):
-        s1, s2 = s2, s1
-    
-    if len(s2) == 0:
-        return len(s1)
-    
+def _edit_distance_py(s1: str, s2: str) -> int:
+    """Pure-Python Levenshtein DP over two lowercased strings"""
     prev_row = range(len(s2) + 1)
     
     for i, c1 in enumerate(s1):
@@ -177,6 +271,42 @@ def edit_distance(s1: str, s2: str) -> int:
     return prev_row[-1]
 
 
+if _NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _edit_distance_codes(a, b):
+        """Levenshtein DP over two code-point arrays (len(a) >= len(b))"""
+        prev_row = np.arange(len(b) + 1, dtype=np.int64)
+        curr_row = np.empty(len(b) + 1, dtype=np.int64)
+        for i in range(len(a)):
+            curr_row[0] = i + 1
+            for j in range(len(b)):
+                cost = prev_row[j] + (1 if a[i] != b[j] else 0)
+                curr_row[j + 1] = min(prev_row[j + 1] + 1, curr_row[j] + 1, cost)
+            prev_row, curr_row = curr_row, prev_row
+        return prev_row[len(b)]
+
+    def _to_codes(text: str) -> np.ndarray:
+        return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+    # Compile once at import so the first query does not pay for it
+    _edit_distance_codes(_to_codes("ab"), _to_codes("a"))
+
+
+def edit_distance(s1: str, s2: str) -> int:
+    """Compute Levenshtein edit distance between two strings"""
+    s1, s2 = s1.lower(), s2.lower()
+    
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+    
+    if len(s2) == 0:
+        return len(s1)
+    
+    if _NUMBA_AVAILABLE:
+        return int(_edit_distance_codes(_to_codes(s1), _to_codes(s2)))
+    return _edit_distance_py(s1, s2)
+
+
 def edit_distance_similarity(s1: str, s2: str) -> float:
     """Compute edit distance similarity (0-1 scale)"""
     max_len = max(len(s1), len(s2))
@@ -185,28 +315,243 @@ def edit_distance_similarity(s1: str, s2: str) -> float:
     return 1 - (edit_distance(s1, s2) / max_len)
 
 
+_UUID_PATTERN = re.compile(
+    r'^[0-9a-f]{8}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{4}-?[0-9a-f]{12}$',
+    re.IGNORECASE
+)
+_NUMERIC_PATTERN = re.compile(r'^[+-]?\d+([.,]\d+)?$')
+
+
+def _looks_like_uuid(value: str) -> bool:
+    """Check if a value is a UUID/GUID (with or without dashes)"""
+    return bool(_UUID_PATTERN.match(value))
+
+
+def _is_queryable_value(value: str) -> bool:
+    """
+    Check if a value is worth adding to the LSH index.
+
+    Numeric strings, UUIDs and low-entropy values (few distinct characters,
+    or dominated by a single character) never match user keywords but produce
+    highly collisional shingles that crowd the same hash buckets.
+    """
+    value = value.strip()
+    if _NUMERIC_PATTERN.match(value) or _looks_like_uuid(value):
+        return False
+
+    lowered = value.lower()
+    distinct = set(lowered)
+    if len(distinct) < 3:
+        return False
+
+    # e.g. "xxxxxxx1" or "--------A": nearly every shingle is identical
+    top_count = max(lowered.count(c) for c in distinct)
+    if len(lowered) >= 6 and top_count / len(lowered) > 0.6:
+        return False
+
+    return True
+
+
+# Terms whose presence is a feature of the fallback embedding
+_CLINICAL_TERMS = (
+    'patient', 'subject', 'site', 'visit', 'query', 'status',
+    'date', 'count', 'id', 'name', 'type', 'code', 'value'
+)
+
+
+class EmbeddingCache:
+    """
+    On-disk cache of text embeddings, keyed by content hash and model name.
+    Vectors are stored as float16 blobs and up-cast to float32 on read.
+    """
+    
+    # SQLite's default limit on host parameters per statement
+    _MAX_PARAMS = 900
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+    
+    @staticmethod
+    def key(text: str) -> str:
+        """Content hash used as the cache key"""
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _connect(self) -> sqlite3.Connection:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        # WAL appends commits sequentially instead of rewriting pages in place,
+        # and NORMAL skips the fsync per transaction (a lost tail only means
+        # re-encoding a few texts)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "hash TEXT NOT NULL, model TEXT NOT NULL, vector BLOB NOT NULL, "
+            "PRIMARY KEY (hash, model))"
+        )
+        return conn
+    
+    def get_many(self, keys: List[str], model: str) -> Dict[str, np.ndarray]:
+        """Look up cached vectors for the given keys"""
+        found: Dict[str, np.ndarray] = {}
+        if not keys:
+            return found
+        
+        conn = self._connect()
+        try:
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), self._MAX_PARAMS):
+                chunk = unique_keys[start:start + self._MAX_PARAMS]
+                placeholders = ",".join("?" * len(chunk))
+                rows = conn.execute(
+                    f"SELECT hash, vector FROM embeddings "
+                    f"WHERE model = ? AND hash IN ({placeholders})",
+                    [model, *chunk]
+                )
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16).astype(np.float32)
+        finally:
+            conn.close()
+        return found
+    
+    def put_many(self, vectors: Dict[str, np.ndarray], model: str):
+        """Store vectors in a single transaction"""
+        if not vectors:
+            return
+        
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (hash, model, vector) VALUES (?, ?, ?)",
+                    [
+                        (key, model, np.asarray(vec, dtype=np.float16).tobytes())
+                        for key, vec in vectors.items()
+                    ]
+                )
+        finally:
+            conn.close()
+    
+    def clear(self):
+        """Delete the cache file and its WAL side files"""
+        for path in (self.path, Path(f"{self.path}-wal"), Path(f"{self.path}-shm")):
+            if path.exists():
+                path.unlink()
+
+
 class VectorStore:
     """
     Simple vector store for semantic similarity search.
     Uses sentence embeddings for schema descriptions.
     """
     
+    QUERY_CACHE_SIZE = 256
+    
     def __init__(self):
         self.documents: List[Dict[str, Any]] = []
-        self.embeddings: List[List[float]] = []
+        # One contiguous, L2-normalized float32 row per document, aligned with
+        # self.documents. Only the direction matters for cosine ranking, so no
+        # separate unnormalized copy is kept.
+        self.embeddings: np.ndarray = np.empty((0, 0), dtype=np.float32)
         self._embedder = None
+        # Recent query embeddings; agents re-query with the same question text.
+        # Retrieval runs on several threads, so updates go through the lock
+        self._query_embeddings: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_lock = threading.Lock()
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        # Persist embeddings as int8 codes with one scale per row (SQ8):
+        # a quarter of the float32 size, and cosine ranking is unaffected
+        codes, scales = self._quantize(self.embeddings)
+        state['embeddings'] = codes
+        state['embedding_scales'] = scales
+        state.pop('_query_embeddings', None)
+        state.pop('_query_lock', None)
+        # The encoder (possibly a CUDA fp16 model) is reloaded lazily by
+        # _get_embedder; pickling it bloats the cache and ties it to the GPU.
+        # The 'tfidf' marker is kept so queries stay in the stored vectors' space
+        if not isinstance(state.get('_embedder'), str):
+            state['_embedder'] = None
+        return state
+    
+    def __setstate__(self, state):
+        scales = state.pop('embedding_scales', None)
+        # Caches written when a normalized copy was kept alongside
+        state.pop('_normalized', None)
+        self.__dict__.update(state)
+        self._query_embeddings = OrderedDict()
+        self._query_lock = threading.Lock()
+        if scales is not None:
+            self.embeddings = self._dequantize(self.embeddings, scales)
+        # Caches written before embeddings were stored as a matrix
+        elif not isinstance(self.embeddings, np.ndarray):
+            self.embeddings = self._as_matrix(self.embeddings)
+        # Dequantized rows (and older caches) are not exactly unit length
+        self.embeddings = self._normalize_rows(self.embeddings)
+    
+    @staticmethod
+    def _quantize(matrix: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Symmetric per-row int8 quantization"""
+        if matrix.size == 0:
+            return matrix.astype(np.int8), np.ones((len(matrix), 1), dtype=np.float32)
+        scales = np.abs(matrix).max(axis=1, keepdims=True) / 127.0
+        scales = np.where(scales == 0, 1.0, scales).astype(np.float32)
+        codes = np.round(matrix / scales).astype(np.int8)
+        return codes, scales
+    
+    @staticmethod
+    def _dequantize(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        return codes.astype(np.float32) * scales
+    
+    @staticmethod
+    def _as_matrix(vectors) -> np.ndarray:
+        """Convert a sequence of vectors to a 2-D float32 matrix"""
+        if len(vectors) == 0:
+            return np.empty((0, 0), dtype=np.float32)
+        return np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+    
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        """Contiguous float32 copy of matrix with each row scaled to unit length"""
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return np.ascontiguousarray(matrix / norms, dtype=np.float32)
+    
+    def _append_embeddings(self, vectors: np.ndarray):
+        """Normalize rows and append them to the embedding matrix"""
+        vectors = self._normalize_rows(vectors)
+        if len(self.embeddings) == 0:
+            self.embeddings = vectors
+        else:
+            self.embeddings = np.vstack([self.embeddings, vectors])
     
     def _get_embedder(self):
         """Lazy load embedder"""
         if self._embedder is None:
             try:
                 from sentence_transformers import SentenceTransformer
-                self._embedder = SentenceTransformer('all-MiniLM-L6-v2')
+                self._embedder = self._apply_dtype(
+                    SentenceTransformer(EMBEDDING_CONFIG['model'])
+                )
             except ImportError:
                 # Fallback to simple TF-IDF based approach
                 self._embedder = 'tfidf'
         return self._embedder
     
+    @staticmethod
+    def _apply_dtype(model):
+        """Run the encoder at reduced precision when EMBED_DTYPE asks for it"""
+        import torch
+        
+        dtype = EMBEDDING_CONFIG['dtype']
+        if dtype == 'fp16' and torch.cuda.is_available():
+            # Half precision is only faster on GPU; on CPU it falls back to slow paths
+            return model.half().to('cuda')
+        if dtype == 'bf16':
+            return model.to(torch.bfloat16)
+        return model
+    
     def _compute_embedding(self, text: str) -> List[float]:
         """Compute embedding for text"""
         embedder = self._get_embedder()
@@ -217,73 +562,198 @@ class VectorStore:
         else:
             return embedder.encode(text).tolist()
     
+    def _compute_embeddings(
+        self,
+        texts: List[str],
+        cache: Optional[EmbeddingCache] = None
+    ) -> np.ndarray:
+        """
+        Compute embeddings for many texts, batching the encoder calls.
+        Texts already present in `cache` are not re-encoded.
+        """
+        embedder = self._get_embedder()
+        
+        if embedder == 'tfidf':
+            return self._as_matrix(self._simple_embeddings(texts))
+        
+        # Identical texts (e.g. repeated column descriptions) are encoded once
+        # and the vector is shared by every document that uses them
+        keys = [EmbeddingCache.key(text) for text in texts]
+        unique_texts = dict(zip(keys, texts))
+        
+        if cache is None:
+            encoded = self._encode(embedder, list(unique_texts.values()))
+            vectors_by_key = dict(zip(unique_texts, encoded))
+        else:
+            model = EMBEDDING_CONFIG['model']
+            vectors_by_key = cache.get_many(list(unique_texts), model)
+            
+            missing = [key for key in unique_texts if key not in vectors_by_key]
+            if missing:
+                encoded = self._encode(embedder, [unique_texts[key] for key in missing])
+                new_vectors = dict(zip(missing, encoded))
+                cache.put_many(new_vectors, model)
+                vectors_by_key.update(new_vectors)
+        
+        return np.stack([vectors_by_key[key] for key in keys]).astype(np.float32, copy=False)
+    
+    def _encode(self, embedder, texts: List[str]) -> np.ndarray:
+        """Run the sentence encoder over texts in batches"""
+        # Pass every text in one call: encode() orders texts by length before
+        # forming batches (and restores input order afterwards), so padding
+        # waste is minimal only when it sees the whole set at once
+        vectors = embedder.encode(
+            texts,
+            batch_size=EMBEDDING_CONFIG['batch_size'],
+            convert_to_numpy=True,
+            show_progress_bar=False
+        )
+        # Reduced-precision encoders still store float32 vectors
+        return vectors.astype(np.float32, copy=False)
+    
     def _simple_embedding(self, text: str) -> List[float]:
         """Simple embedding using character and word features"""
-        text = text.lower()
-        words = set(re.findall(r'\w+', text))
-        
-        # Create a simple feature vector
-        features = []
-        
-        # Word length distribution
-        lengths = [len(w) for w in words]
-        features.extend([
-            sum(lengths) / len(lengths) if lengths else 0,  # avg length
-            max(lengths) if lengths else 0,  # max length
-            len(words),  # word count
-        ])
+        return self._simple_embeddings([text])[0].tolist()
+    
+    def _simple_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Simple character/word feature embeddings for a batch of texts"""
+        lowered = [text.lower() for text in texts]
+        word_features = []
+        term_features = []
         
-        # Character frequency features (26 letters)
-        char_counts = [text.count(chr(i)) for i in range(ord('a'), ord('z') + 1)]
-        total = sum(char_counts) or 1
-        features.extend([c / total for c in char_counts])
+        for text in lowered:
+            words = set(re.findall(r'\w+', text))
+            
+            # Word length distribution
+            lengths = [len(w) for w in words]
+            word_features.append((
+                sum(lengths) / len(lengths) if lengths else 0,  # avg length
+                max(lengths) if lengths else 0,  # max length
+                len(words),  # word count
+            ))
+            
+            # Common clinical terms presence
+            term_features.append([term in text for term in _CLINICAL_TERMS])
         
-        # Common clinical terms presence
-        clinical_terms = ['patient', 'subject', 'site', 'visit', 'query', 'status', 
-                         'date', 'count', 'id', 'name', 'type', 'code', 'value']
-        features.extend([1.0 if term in text else 0.0 for term in clinical_terms])
+        # Character frequency features (26 letters), counted for the whole
+        # batch with one bincount over the UTF-8 bytes. Bytes a-z never occur
+        # inside multi-byte sequences, so this matches per-letter str.count.
+        encoded = [text.encode('utf-8') for text in lowered]
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        rows = np.repeat(np.arange(len(encoded)), [len(e) for e in encoded])
+        letters = (data >= ord('a')) & (data <= ord('z'))
+        char_counts = np.bincount(
+            rows[letters] * 26 + (data[letters] - ord('a')),
+            minlength=len(encoded) * 26
+        ).reshape(len(encoded), 26)
+        total = char_counts.sum(axis=1, keepdims=True)
         
-        return features
+        return np.hstack([
+            np.array(word_features, dtype=np.float64).reshape(len(encoded), 3),
+            char_counts / np.maximum(total, 1),
+            np.array(term_features, dtype=np.float64).reshape(len(encoded), len(_CLINICAL_TERMS)),
+        ])
     
     def add(self, document: Dict[str, Any], text: str):
         """Add a document with its text to the store"""
         self.documents.append(document)
-        self.embeddings.append(self._compute_embedding(text))
+        self._append_embeddings(self._as_matrix([self._compute_embedding(text)]))
+    
+    def add_batch(
+        self,
+        documents: List[Dict[str, Any]],
+        texts: List[str],
+        cache: Optional[EmbeddingCache] = None
+    ):
+        """Add many documents at once, encoding their texts in large batches"""
+        if not documents:
+            return
+        self.documents.extend(documents)
+        self._append_embeddings(self._compute_embeddings(texts, cache=cache))
+    
+    def _query_embedding(self, query: str) -> np.ndarray:
+        """Embed a query, reusing the vector if the same text was seen recently"""
+        with self._query_lock:
+            cached = self._query_embeddings.get(query)
+            if cached is not None:
+                self._query_embeddings.move_to_end(query)
+                return cached
+        
+        vector = np.asarray(self._compute_embedding(query), dtype=np.float32)
+        self._remember_query(query, vector)
+        return vector
+    
+    def _query_embedding_batch(self, queries: List[str]) -> List[np.ndarray]:
+        """Embed many queries, encoding all uncached ones in a single call"""
+        vectors = {}
+        missing = []
+        with self._query_lock:
+            for query in dict.fromkeys(queries):
+                cached = self._query_embeddings.get(query)
+                if cached is not None:
+                    self._query_embeddings.move_to_end(query)
+                    vectors[query] = cached
+                else:
+                    missing.append(query)
+        
+        if missing:
+            for query, vector in zip(missing, self._compute_embeddings(missing)):
+                vectors[query] = vector
+                self._remember_query(query, vector)
+        
+        return [vectors[query] for query in queries]
+    
+    def _remember_query(self, query: str, vector: np.ndarray):
+        with self._query_lock:
+            self._query_embeddings[query] = vector
+            self._query_embeddings.move_to_end(query)
+            if len(self._query_embeddings) > self.QUERY_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+    
+    @staticmethod
+    def _fit_query(vector: np.ndarray, dim: int) -> np.ndarray:
+        """Pad or truncate a query to the stored dimension and L2-normalize it"""
+        if len(vector) != dim:
+            # Zeros in the padding contribute nothing to the dot product
+            vector = np.pad(vector[:dim], (0, max(0, dim - len(vector))))
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def _top_k(self, scores: np.ndarray, top_k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """Select the top_k in O(N) and sort only those"""
+        if top_k < len(scores):
+            top = np.argpartition(-scores, top_k)[:top_k]
+        else:
+            top = np.arange(len(scores))
+        order = top[np.argsort(-scores[top], kind='stable')]
+        return [(self.documents[i], float(scores[i])) for i in order]
     
     def search(self, query: str, top_k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
         """Search for similar documents"""
         if not self.documents:
             return []
         
-        query_embedding = self._compute_embedding(query)
+        matrix = self.embeddings
+        query_embedding = self._fit_query(self._query_embedding(query), matrix.shape[1])
         
-        # Compute similarities
-        similarities = []
-        for i, doc_embedding in enumerate(self.embeddings):
-            sim = self._cosine_similarity(query_embedding, doc_embedding)
-            similarities.append((self.documents[i], sim))
-        
-        # Sort by similarity
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
+        # One matrix-vector product scores every document at once
+        scores = matrix @ query_embedding
+        return self._top_k(scores, top_k)
     
-    def _cosine_similarity(self, v1: List[float], v2: List[float]) -> float:
-        """Compute cosine similarity between two vectors"""
-        if len(v1) != len(v2):
-            # Pad shorter vector
-            max_len = max(len(v1), len(v2))
-            v1 = v1 + [0] * (max_len - len(v1))
-            v2 = v2 + [0] * (max_len - len(v2))
-        
-        dot_product = sum(a * b for a, b in zip(v1, v2))
-        norm1 = sum(a * a for a in v1) ** 0.5
-        norm2 = sum(b * b for b in v2) ** 0.5
+    def search_batch(self, queries: List[str], top_k: int = 5) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """Search for many queries at once; results are in query order"""
+        if not self.documents or not queries:
+            return [[] for _ in queries]
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
+        matrix = self.embeddings
+        dim = matrix.shape[1]
+        query_matrix = np.stack([
+            self._fit_query(vector, dim) for vector in self._query_embedding_batch(queries)
+        ]).astype(np.float32, copy=False)
         
-        return dot_product / (norm1 * norm2)
-
+        # One matrix-matrix product scores every (query, document) pair
+        scores = query_matrix @ matrix.T
+        return [self._top_k(row, top_k) for row in scores]
 
 class DatabasePreprocessor:
     """
@@ -292,11 +762,31 @@ class DatabasePreprocessor:
     2. Vector store for schema descriptions
     """
     
+    ENTITY_CACHE_SIZE = 512
+    
     def __init__(self, cache_dir: str = None):
         self.cache_dir = Path(cache_dir or "cache/preprocessing")
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        self.lsh_index = MinHashLSH(num_perm=128, threshold=0.3)
+        embed_cache_dir = Path(EMBEDDING_CONFIG['cache_dir'] or self.cache_dir)
+        self.embedding_cache = EmbeddingCache(embed_cache_dir / "embed_cache.sqlite")
+        
+        # Ranked entity matches per (keyword, top_k), cleared whenever the LSH
+        # index is replaced or extended; guarded for concurrent retrieval
+        self._entity_results: "OrderedDict[Tuple[str, int], List[Dict]]" = OrderedDict()
+        self._entity_results_lock = threading.Lock()
+        self._entity_results_generation = 0
+        
+        self._reset_indexes()
+    
+    def _reset_indexes(self):
+        """Start from empty indexes built with the current LSH_CONFIG"""
+        self.lsh_index = MinHashLSH(
+            num_perm=LSH_CONFIG['num_perm'],
+            threshold=LSH_CONFIG['threshold'],
+            num_bands=LSH_CONFIG['num_bands']
+        )
+        self._clear_entity_results()
         self.vector_store = VectorStore()
         self.schema_descriptions: Dict[str, str] = {}
         
@@ -307,6 +797,13 @@ class DatabasePreprocessor:
             'tables_processed': 0
         }
     
+    def _clear_entity_results(self):
+        """Drop cached entity matches after the LSH index changes"""
+        with self._entity_results_lock:
+            self._entity_results.clear()
+            # Lookups that started against the old index must not store their matches
+            self._entity_results_generation += 1
+    
     def build_value_index(self, db_manager, sample_limit: int = 1000):
         """
         Build LSH index from database values
@@ -323,55 +820,73 @@ class DatabasePreprocessor:
         
         console.print(f"\n[bold blue]Building LSH index for {len(tables)} tables...[/bold blue]")
         
+        indexable = [table_name for table_name in tables if not table_name.startswith('_')]
+        
         with Progress() as progress:
             task = progress.add_task("Indexing values...", total=len(tables))
+            progress.advance(task, len(tables) - len(indexable))
             
-            for table_name in tables:
-                if table_name.startswith('_'):
-                    progress.advance(task)
-                    continue
-                
-                columns = db_manager.get_table_columns(table_name)
+            if indexable:
+                # Each table needs a round-trip per text column; fetch tables
+                # concurrently and hash their values here, in table order, as
+                # each arrives (the LSH index itself is not thread-safe)
+                with ThreadPoolExecutor(max_workers=min(4, len(indexable))) as executor:
+                    table_values = executor.map(
+                        partial(self._collect_table_values, db_manager, sample_limit=sample_limit),
+                        indexable
+                    )
+                    for values in table_values:
+                        self.lsh_index.add_batch(values)
+                        self.stats['total_values_indexed'] += len(values)
+                        self.stats['tables_processed'] += 1
+                        progress.advance(task)
+        
+        self._clear_entity_results()
+        console.print(f"[green]Indexed {self.stats['total_values_indexed']} unique values[/green]")
+    
+    def _collect_table_values(self, db_manager, table_name: str, sample_limit: int) -> List[ValueIndex]:
+        """Fetch the distinct, queryable text values of one table"""
+        values = []
+        columns = db_manager.get_table_columns(table_name)
+        
+        for col_info in columns:
+            col_name = col_info['column_name']
+            data_type = col_info['data_type']
+            
+            # Skip non-text columns and metadata columns
+            if data_type not in ('text', 'character varying', 'varchar', 'char'):
+                continue
+            if col_name.startswith('_'):
+                continue
+            
+            # Get unique values
+            try:
+                query = f"""
+                    SELECT DISTINCT {col_name} 
+                    FROM {table_name} 
+                    WHERE {col_name} IS NOT NULL 
+                    AND {col_name} != ''
+                    LIMIT {sample_limit}
+                """
+                result = db_manager.execute_query(query)
                 
-                for col_info in columns:
-                    col_name = col_info['column_name']
-                    data_type = col_info['data_type']
-                    
-                    # Skip non-text columns and metadata columns
-                    if data_type not in ('text', 'character varying', 'varchar', 'char'):
+                for row in result:
+                    value = str(row[col_name])
+                    if not value or len(value) <= 1 or len(value) >= 200:
                         continue
-                    if col_name.startswith('_'):
+                    if not _is_queryable_value(value):
                         continue
-                    
-                    # Get unique values
-                    try:
-                        query = f"""
-                            SELECT DISTINCT {col_name} 
-                            FROM {table_name} 
-                            WHERE {col_name} IS NOT NULL 
-                            AND {col_name} != ''
-                            LIMIT {sample_limit}
-                        """
-                        result = db_manager.execute_query(query)
-                        
-                        for row in result:
-                            value = str(row[col_name])
-                            if value and len(value) > 1 and len(value) < 200:
-                                value_index = ValueIndex(
-                                    value=value,
-                                    table_name=table_name,
-                                    column_name=col_name,
-                                    data_type=data_type
-                                )
-                                self.lsh_index.add(value_index)
-                                self.stats['total_values_indexed'] += 1
-                    except Exception as e:
-                        pass  # Skip problematic columns
-                
-                self.stats['tables_processed'] += 1
-                progress.advance(task)
+
+                    values.append(ValueIndex(
+                        value=value,
+                        table_name=table_name,
+                        column_name=col_name,
+                        data_type=data_type
+                    ))
+            except Exception as e:
+                pass  # Skip problematic columns
         
-        console.print(f"[green]Indexed {self.stats['total_values_indexed']} unique values[/green]")
+        return values
     
     def build_description_index(self, db_manager, schema_manager=None):
         """
@@ -388,6 +903,10 @@ class DatabasePreprocessor:
         
         tables = db_manager.get_all_tables()
         
+        # Collect everything first so the embedder runs over large batches
+        pending_docs: List[Dict[str, Any]] = []
+        pending_texts: List[str] = []
+        
         for table_name in tables:
             if table_name.startswith('_'):
                 continue
@@ -412,8 +931,8 @@ class DatabasePreprocessor:
                     'column': col_name,
                     'data_type': data_type
                 }
-                text = f"{table_name} {col_name} {readable_name}"
-                self.vector_store.add(doc, text)
+                pending_docs.append(doc)
+                pending_texts.append(f"{table_name} {col_name} {readable_name}")
             
             # Add table description
             table_description = f"Table {table_name} contains: {', '.join(col_descriptions[:10])}"
@@ -427,13 +946,19 @@ class DatabasePreprocessor:
                 'table': table_name,
                 'column_count': len(columns)
             }
-            self.vector_store.add(doc, table_description)
+            pending_docs.append(doc)
+            pending_texts.append(table_description)
             self.stats['total_descriptions'] += 1
         
+        self.vector_store.add_batch(pending_docs, pending_texts, cache=self.embedding_cache)
+        
         console.print(f"[green]Indexed {self.stats['total_descriptions']} schema descriptions[/green]")
     
     def preprocess(self, db_manager, schema_manager=None):
         """Run full preprocessing pipeline"""
+        # Replace anything load_cache brought in (e.g. an index built with
+        # other LSH settings) rather than adding to it
+        self._reset_indexes()
         self.build_value_index(db_manager)
         self.build_description_index(db_manager, schema_manager)
         self.save_cache()
@@ -450,13 +975,22 @@ class DatabasePreprocessor:
             'stats': self.stats
         }
         
+        # Protocol 5 frames large payloads and avoids the per-object overhead
+        # of the default protocol on big LSH tables
         with open(cache_file, 'wb') as f:
-            pickle.dump(data, f)
+            pickle.dump(data, f, protocol=5)
         
         print(f"Cache saved to {cache_file}")
     
     def load_cache(self) -> bool:
-        """Load preprocessed data from cache"""
+        """
+        Load preprocessed data from cache.
+        
+        Returns False when there is no usable cache, and also when the cached
+        LSH index was built with different LSH_CONFIG settings; the stale index
+        is still loaded so lookups keep working, but callers that can rebuild
+        (cli setup) should run preprocess() to apply the new settings.
+        """
         cache_file = self.cache_dir / "preprocess_cache.pkl"
         
         if not cache_file.exists():
@@ -467,12 +1001,20 @@ class DatabasePreprocessor:
                 data = pickle.load(f)
             
             self.lsh_index = data['lsh_index']
+            self._clear_entity_results()
             self.vector_store = data['vector_store']
             self.schema_descriptions = data['schema_descriptions']
             self.stats = data['stats']
             
             print(f"Cache loaded: {self.stats['total_values_indexed']} values, "
                   f"{self.stats['total_descriptions']} descriptions")
+            
+            # The pickled index carries the settings it was built with
+            cached_config = {key: getattr(self.lsh_index, key, None) for key in LSH_CONFIG}
+            if cached_config != LSH_CONFIG:
+                print(f"Warning: cached LSH index was built with {cached_config}, "
+                      f"but LSH_CONFIG is {LSH_CONFIG}; rebuild the index to apply it")
+                return False
             return True
         except Exception as e:
             print(f"Failed to load cache: {e}")
@@ -489,6 +1031,16 @@ class DatabasePreprocessor:
         Returns:
             List of matching entities with metadata
         """
+        # Keywords recur across questions ("site", "open", "queries"), so
+        # reuse their ranked matches until the LSH index is replaced or grows
+        key = (keyword, top_k)
+        with self._entity_results_lock:
+            cached = self._entity_results.get(key)
+            if cached is not None:
+                self._entity_results.move_to_end(key)
+                return [dict(match) for match in cached]
+            generation = self._entity_results_generation
+        
         # Get LSH candidates
         lsh_results = self.lsh_index.query(keyword, top_k=top_k * 2)
         
@@ -505,9 +1057,15 @@ class DatabasePreprocessor:
                 'similarity': combined_score
             })
         
-        # Sort by combined score
-        results.sort(key=lambda x: x['similarity'], reverse=True)
-        return results[:top_k]
+        # Keep the best top_k by combined score
+        results = heapq.nlargest(top_k, results, key=lambda x: x['similarity'])
+        
+        with self._entity_results_lock:
+            if generation == self._entity_results_generation:
+                self._entity_results[key] = results
+                if len(self._entity_results) > self.ENTITY_CACHE_SIZE:
+                    self._entity_results.popitem(last=False)
+        return [dict(match) for match in results]
     
     def retrieve_context(self, query: str, top_k: int = 5) -> List[Dict]:
         """
@@ -521,7 +1079,19 @@ class DatabasePreprocessor:
             List of relevant schema descriptions
         """
         results = self.vector_store.search(query, top_k=top_k)
-        
+        return self._format_context(results)
+    
+    def retrieve_context_batch(self, queries: List[str], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Retrieve schema context for several queries with one batched
+        embedding call and one similarity matrix product
+        """
+        return [
+            self._format_context(results)
+            for results in self.vector_store.search_batch(queries, top_k=top_k)
+        ]
+    
+    def _format_context(self, results: List[Tuple[Dict[str, Any], float]]) -> List[Dict]:
         return [
             {
                 'type': doc['type'],
@@ -12,20 +12,36 @@ Usage:
     from sage_bench import run_evaluation, load_testbench
 """
 
+from functools import lru_cache
 from pathlib import Path
 
 __version__ = "2.0"
-__all__ = ['run_evaluation', 'load_testbench', 'TestResult', 'EvaluationSummary']
+__all__ = [
+    'run_evaluation', 'load_testbench', 'TestResult', 'EvaluationSummary',
+    'extract_answer', 'compare_answers', 'build_comparator'
+]
 
 SAGE_BENCH_DIR = Path(__file__).parent
 TESTBENCH_PATH = SAGE_BENCH_DIR / "new_testbench.json"
 
 
-def load_testbench():
-    """Load the SAGE-BENCH testbench"""
-    import json
-    with open(TESTBENCH_PATH, 'r') as f:
-        return json.load(f)
+@lru_cache(maxsize=4)
+def _load_testbench_cached(path: str, mtime: float):
+    # mtime is part of the key so an edited testbench is re-read
+    from utils.json_io import read_json
+    return read_json(path)
+
+
+def load_testbench(path: Path = TESTBENCH_PATH):
+    """
+    Load the SAGE-BENCH testbench.
+    
+    The parsed testbench is cached until the file changes, so every caller
+    gets the same dict: treat it (and the test dicts inside) as read-only,
+    and copy a test before changing it.
+    """
+    path = Path(path)
+    return _load_testbench_cached(str(path), path.stat().st_mtime)
 
 
 # Lazy imports to avoid circular dependencies
@@ -39,5 +55,14 @@ def __getattr__(name):
     elif name == 'EvaluationSummary':
         from sage_bench.run_evaluation import EvaluationSummary
         return EvaluationSummary
+    elif name == 'extract_answer':
+        from sage_bench.comparators import extract_answer
+        return extract_answer
+    elif name == 'compare_answers':
+        from sage_bench.comparators import compare_answers
+        return compare_answers
+    elif name == 'build_comparator':
+        from sage_bench.comparators import build_comparator
+        return build_comparator
     raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
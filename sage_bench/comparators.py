@@ -0,0 +1,80 @@
+"""
+SAGE-BENCH answer extraction and comparison
+"""
+from typing import Any, Callable, Dict, Optional
+
+
+def extract_answer(execution_result: Optional[Dict]) -> Any:
+    """Pull the answer out of a pipeline execution result"""
+    if not execution_result or not execution_result.get('data'):
+        return None
+    
+    data = execution_result['data']
+    if len(data) == 1 and len(data[0]) == 1:
+        return data[0][0]
+    elif len(data) == 1:
+        return data[0][0] if data[0] else None
+    # Multiple rows - return as list
+    return [row[0] for row in data if row]
+
+
+def _to_float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def build_comparator(expected: Any, expected_type: str, tolerance: float = None) -> Callable[[Any], bool]:
+    """
+    Build a checker for one test's expected answer.
+    
+    The type dispatch and the work on the expected side (float conversion,
+    normalizing and sorting list items) happen once here rather than on
+    every comparison.
+    """
+    if expected_type in ("number", "percentage"):
+        expected_num = _to_float(expected)
+        if expected_num is None:
+            return lambda actual: False
+        if expected_type == "percentage":
+            tol = tolerance if tolerance else 0.5
+        else:
+            tol = tolerance
+        
+        def compare_number(actual: Any) -> bool:
+            if actual is None:
+                return False
+            actual_num = _to_float(actual)
+            if actual_num is None:
+                return False
+            if tol:
+                return abs(expected_num - actual_num) <= tol
+            return expected_num == actual_num
+        return compare_number
+    
+    elif expected_type == "string":
+        expected_str = str(expected).lower().strip()
+        return lambda actual: actual is not None and str(actual).lower().strip() == expected_str
+    
+    elif expected_type == "list":
+        try:
+            expected_items = sorted(str(e).lower().strip() for e in expected)
+        except TypeError:
+            # A scalar where a list was expected can never match
+            return lambda actual: False
+        # Compare as multisets so a duplicated or missing row is not hidden;
+        # the length check rejects most wrong answers without normalizing them
+        return lambda actual: (
+            isinstance(actual, list)
+            and len(actual) == len(expected_items)
+            and sorted(str(a).lower().strip() for a in actual) == expected_items
+        )
+    
+    expected_str = str(expected)
+    return lambda actual: actual is not None and str(actual) == expected_str
+
+
+def compare_answers(expected: Any, actual: Any, expected_type: str, tolerance: float = None) -> bool:
+    """Compare expected and actual answers with type awareness"""
+    return build_comparator(expected, expected_type, tolerance)(actual)
@@ -15,28 +15,46 @@ Usage:
     python -m sage_bench.run_evaluation --category count    # Run tests by category
 """
 import argparse
+import hashlib
 import json
+import multiprocessing
 import os
+import pickle
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable
 from dataclasses import dataclass, asdict
 from pathlib import Path
+from types import SimpleNamespace
 
 # Add parent directory to path for imports
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from rich.console import Console
 from rich.table import Table
-from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
 from rich.panel import Panel
-from rich.markdown import Markdown
+
+from config.settings import MODELS, SCHEMA_CACHE_PATH
+from sage_bench import load_testbench as load_cached_testbench
+from sage_bench.comparators import extract_answer, compare_answers, build_comparator
+from utils.json_io import write_json, json_line
 
 console = Console()
 
 # Path to testbench
 TESTBENCH_PATH = Path(__file__).parent / "new_testbench.json"
 RESULTS_DIR = Path(__file__).parent / "results"
+PIPELINE_CACHE_DIR = RESULTS_DIR / ".pipeline_cache"
+
+# Options every benchmark question is run with
+PIPELINE_RUN_OPTIONS = {
+    'num_candidates': 3,
+    'execute_result': True,
+    'explain_result': False,
+    'disable_unit_test': True
+}
 
 
 @dataclass
@@ -53,6 +71,7 @@ class TestResult:
     error: Optional[str] = None
     execution_time: float = 0.0
     tokens_used: int = 0
+    cached: bool = False  # Replayed from PipelineRunCache, not run live
 
 
 @dataclass
@@ -66,16 +85,16 @@ class EvaluationSummary:
     by_category: Dict[str, Dict[str, int]]
     total_time: float
     total_tokens: int
+    cached_tests: int = 0  # Left out of total_time and total_tokens
 
 
 def load_testbench() -> Dict:
-    """Load the SAGE-BENCH testbench"""
+    """Load the SAGE-BENCH testbench (shared and cached; do not modify it)"""
     if not TESTBENCH_PATH.exists():
         console.print(f"[red]Error: Testbench not found at {TESTBENCH_PATH}[/red]")
         sys.exit(1)
     
-    with open(TESTBENCH_PATH, 'r') as f:
-        return json.load(f)
+    return load_cached_testbench(TESTBENCH_PATH)
 
 
 def get_tests_by_difficulty(testbench: Dict, difficulties: List[str]) -> List[Dict]:
@@ -94,7 +113,8 @@ def get_tests_by_ids(testbench: Dict, test_ids: List[int]) -> List[Dict]:
         if difficulty in testbench.get('tests', {}):
             all_tests.extend(testbench['tests'][difficulty])
     
-    return [t for t in all_tests if t['id'] in test_ids]
+    wanted = set(test_ids)
+    return [t for t in all_tests if t['id'] in wanted]
 
 
 def get_tests_by_category(testbench: Dict, categories: List[str]) -> List[Dict]:
@@ -104,7 +124,8 @@ def get_tests_by_category(testbench: Dict, categories: List[str]) -> List[Dict]:
         if difficulty in testbench.get('tests', {}):
             all_tests.extend(testbench['tests'][difficulty])
     
-    return [t for t in all_tests if t.get('category') in categories]
+    wanted = set(categories)
+    return [t for t in all_tests if t.get('category') in wanted]
 
 
 def parse_id_range(id_str: str) -> List[int]:
@@ -115,79 +136,99 @@ def parse_id_range(id_str: str) -> List[int]:
     return [int(id_str)]
 
 
-def compare_answers(expected: Any, actual: Any, expected_type: str, tolerance: float = None) -> bool:
-    """Compare expected and actual answers with type awareness"""
-    if actual is None:
-        return False
+class PipelineRunCache:
+    """
+    On-disk memo of pipeline.run outputs, so re-running a question against an
+    unchanged schema (reruns after a failure, debugging a single test) does
+    not repeat the LLM calls and SQL execution.
     
-    if expected_type == "number":
-        try:
-            expected_num = float(expected)
-            actual_num = float(actual)
-            if tolerance:
-                return abs(expected_num - actual_num) <= tolerance
-            return expected_num == actual_num
-        except (ValueError, TypeError):
-            return False
-    
-    elif expected_type == "percentage":
-        try:
-            expected_num = float(expected)
-            actual_num = float(actual)
-            tol = tolerance if tolerance else 0.5
-            return abs(expected_num - actual_num) <= tol
-        except (ValueError, TypeError):
-            return False
+    Entries are keyed by question, run options, the configured models and a
+    namespace; the default namespace is a fingerprint of the cached schema,
+    so a schema refresh starts a fresh cache. Only runs whose SQL executed
+    successfully are stored, so a transient failure (rate limit, timeout)
+    is retried next time instead of being replayed.
+    """
     
-    elif expected_type == "string":
-        return str(expected).lower().strip() == str(actual).lower().strip()
+    def __init__(self, directory: Path = PIPELINE_CACHE_DIR, namespace: Optional[str] = None):
+        self.directory = Path(directory)
+        self.namespace = namespace if namespace is not None else self.schema_fingerprint()
     
-    elif expected_type == "list":
-        if not isinstance(actual, list):
-            return False
-        expected_set = set(str(e).lower().strip() for e in expected)
-        actual_set = set(str(a).lower().strip() for a in actual)
-        return expected_set == actual_set
+    @staticmethod
+    def schema_fingerprint() -> str:
+        """Hash of the schema cache file, or '' when it has not been built"""
+        try:
+            return hashlib.sha256(Path(SCHEMA_CACHE_PATH).read_bytes()).hexdigest()[:16]
+        except OSError:
+            return ''
     
-    return str(expected) == str(actual)
-
-
-def run_single_test(pipeline, test: Dict) -> TestResult:
-    """Run a single test case"""
+    def _path(self, question: str) -> Path:
+        key = json.dumps([self.namespace, question, PIPELINE_RUN_OPTIONS, MODELS], sort_keys=True)
+        return self.directory / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.pkl"
+    
+    def get(self, question: str) -> Optional[SimpleNamespace]:
+        """Cached run for the question, with the attributes run_single_test reads"""
+        try:
+            with open(self._path(question), 'rb') as f:
+                return SimpleNamespace(**pickle.load(f))
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+    
+    @staticmethod
+    def cacheable(result) -> bool:
+        """Whether a pipeline run succeeded end to end and is worth replaying"""
+        execution_result = getattr(result, 'execution_result', None)
+        return bool(getattr(result, 'success', False) and execution_result and execution_result.get('success'))
+    
+    def put(self, question: str, result) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(question)
+        tmp_path = path.with_suffix('.tmp')
+        with open(tmp_path, 'wb') as f:
+            pickle.dump({
+                'sql': result.sql,
+                'execution_result': result.execution_result,
+                'total_tokens': result.total_tokens
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+
+def run_single_test(
+    pipeline,
+    test: Dict,
+    cache: Optional[PipelineRunCache] = None,
+    comparator: Optional[Callable[[Any], bool]] = None
+) -> TestResult:
+    """
+    Run a single test case, reusing a cached pipeline run when available.
+    `comparator` is the test's prebuilt answer check (see build_comparator).
+    """
     import time
     
     start_time = time.time()
     
     try:
-        result = pipeline.run(
-            test['question'],
-            num_candidates=3,
-            execute_result=True,
-            explain_result=False,
-            disable_unit_test=True
-        )
+        result = cache.get(test['question']) if cache is not None else None
+        cached = result is not None
+        if result is None:
+            result = pipeline.run(test['question'], **PIPELINE_RUN_OPTIONS)
+            if cache is not None and cache.cacheable(result):
+                try:
+                    cache.put(test['question'], result)
+                except (OSError, pickle.PicklingError):
+                    pass  # A cache that can't be written must not fail the test
         
         execution_time = time.time() - start_time
         
-        # Extract actual answer from result
-        actual_answer = None
-        if result.execution_result and result.execution_result.get('data'):
-            data = result.execution_result['data']
-            if len(data) == 1 and len(data[0]) == 1:
-                actual_answer = data[0][0]
-            elif len(data) == 1:
-                actual_answer = data[0][0] if data[0] else None
-            else:
-                # Multiple rows - return as list
-                actual_answer = [row[0] for row in data if row]
+        actual_answer = extract_answer(result.execution_result)
         
         # Compare answers
-        passed = compare_answers(
-            test['expected_answer'],
-            actual_answer,
-            test['expected_type'],
-            test.get('tolerance')
-        )
+        if comparator is None:
+            comparator = build_comparator(
+                test['expected_answer'],
+                test['expected_type'],
+                test.get('tolerance')
+            )
+        passed = comparator(actual_answer)
         
         return TestResult(
             test_id=test['id'],
@@ -199,7 +240,8 @@ def run_single_test(pipeline, test: Dict) -> TestResult:
             generated_sql=result.sql,
             passed=passed,
             execution_time=execution_time,
-            tokens_used=result.total_tokens
+            tokens_used=result.total_tokens,
+            cached=cached
         )
         
     except Exception as e:
@@ -217,36 +259,131 @@ def run_single_test(pipeline, test: Dict) -> TestResult:
         )
 
 
-def run_evaluation(tests: List[Dict], verbose: bool = True) -> tuple[List[TestResult], EvaluationSummary]:
-    """Run evaluation on a list of tests"""
+# Pipeline owned by a process-pool worker, built once by _init_worker
+_worker_pipeline = None
+
+
+def _init_worker():
+    global _worker_pipeline
     from chess_sql import create_pipeline
+    _worker_pipeline = create_pipeline(verbose=False)
+
+
+def _run_test_in_worker(test: Dict, cache: Optional[PipelineRunCache]) -> TestResult:
+    return run_single_test(_worker_pipeline, test, cache)
+
+
+def run_evaluation(
+    tests: List[Dict],
+    verbose: bool = True,
+    log_path: Optional[Path] = None,
+    workers: int = 1,
+    cache: Optional[PipelineRunCache] = None,
+    pipeline=None,
+    executor: str = "thread"
+) -> tuple[List[TestResult], EvaluationSummary]:
+    """
+    Run evaluation on a list of tests
+    
+    If `log_path` is given, each result is appended to it as one JSON line
+    as soon as its test finishes, so an interrupted run keeps the results
+    it already has without rewriting the file per test.
+    
+    With `workers` > 1, up to that many tests run at once on a shared
+    pipeline; each test spends most of its time waiting on the LLM API and
+    the database, so they overlap well. Results keep the order of `tests`.
+    
+    With a `cache`, questions answered by an earlier run are not re-run;
+    those results are marked `cached` and left out of the time and token
+    totals so the summary only measures live runs.
+    
+    Pass a `pipeline` to reuse one across calls (e.g. one call per
+    difficulty); building it loads the schema, indexes and LLM client.
+    
+    With `executor="process"`, tests run in `workers` processes that each
+    build their own pipeline (and ignore `pipeline`), for backends whose
+    time goes into Python code rather than waiting on I/O. Each process
+    paces its own LLM requests, so size GROQ_REQUESTS_PER_MINUTE per worker.
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn, BarColumn, TaskProgressColumn
+    
+    if executor == "process":
+        pool = ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            initializer=_init_worker,
+            # Workers start on first submit, while rich's refresh thread is
+            # running; forking then can copy a held console lock into the
+            # child. They build their own pipeline anyway, so spawn them
+            mp_context=multiprocessing.get_context('spawn')
+        )
+    elif executor == "thread":
+        pool = ThreadPoolExecutor(max_workers=max(1, workers))
+    else:
+        raise ValueError(f"Unknown executor: {executor!r} (expected 'thread' or 'process')")
     
-    # Create pipeline
-    console.print("\n[bold blue]Initializing CHESS Pipeline...[/bold blue]")
-    pipeline = create_pipeline(verbose=False)
+    if pipeline is None and executor == "thread":
+        from chess_sql import create_pipeline
+        
+        console.print("\n[bold blue]Initializing CHESS Pipeline...[/bold blue]")
+        pipeline = create_pipeline(verbose=False)
     
-    results: List[TestResult] = []
+    results: List[Optional[TestResult]] = [None] * len(tests)
     total_tokens = 0
     total_time = 0.0
+    cached_tests = 0
+    
+    if log_path is not None:
+        log_path.parent.mkdir(parents=True, exist_ok=True)
     
     # Progress tracking
-    with Progress(
+    with pool, Progress(
         SpinnerColumn(),
         TextColumn("[progress.description]{task.description}"),
         BarColumn(),
         TaskProgressColumn(),
         console=console
-    ) as progress:
+    ) as progress, (open(log_path, 'a') if log_path is not None else nullcontext()) as log_file:
         task = progress.add_task("[cyan]Running tests...", total=len(tests))
         
-        for test in tests:
+        # Start tests of the same difficulty and answer type back to back so
+        # consecutive requests share more of their prompts with the
+        # provider's prompt cache; results still come back in input order
+        run_order = sorted(
+            range(len(tests)),
+            key=lambda i: (tests[i]['difficulty'], tests[i]['expected_type'])
+        )
+        futures = {}
+        for index in run_order:
+            test = tests[index]
+            if executor == "process":
+                # Comparators are closures and can't be pickled; the worker builds its own
+                future = pool.submit(_run_test_in_worker, test, cache)
+            else:
+                future = pool.submit(
+                    run_single_test, pipeline, test, cache,
+                    build_comparator(test['expected_answer'], test['expected_type'], test.get('tolerance'))
+                )
+            futures[future] = index
+        
+        for future in as_completed(futures):
+            index = futures[future]
+            test = tests[index]
+            result = future.result()
+            results[index] = result
             progress.update(task, description=f"[cyan]Test {test['id']}: {test['question'][:40]}...")
             
-            result = run_single_test(pipeline, test)
-            results.append(result)
+            if log_file is not None:
+                log_file.write(json_line(result))
+                # A test costs seconds of LLM time; make its line durable
+                # before moving on so a crash cannot lose it
+                log_file.flush()
+                os.fsync(log_file.fileno())
             
-            total_tokens += result.tokens_used
-            total_time += result.execution_time
+            if result.cached:
+                cached_tests += 1
+            else:
+                total_tokens += result.tokens_used
+                total_time += result.execution_time
             
             # Show result indicator
             status = "[green]✓[/green]" if result.passed else "[red]✗[/red]"
@@ -263,21 +400,9 @@ def run_evaluation(tests: List[Dict], verbose: bool = True) -> tuple[List[TestRe
     by_category = {}
     
     for r in results:
-        # By difficulty
-        if r.difficulty not in by_difficulty:
-            by_difficulty[r.difficulty] = {'passed': 0, 'failed': 0}
-        if r.passed:
-            by_difficulty[r.difficulty]['passed'] += 1
-        else:
-            by_difficulty[r.difficulty]['failed'] += 1
-        
-        # By category
-        if r.category not in by_category:
-            by_category[r.category] = {'passed': 0, 'failed': 0}
-        if r.passed:
-            by_category[r.category]['passed'] += 1
-        else:
-            by_category[r.category]['failed'] += 1
+        outcome = 'passed' if r.passed else 'failed'
+        by_difficulty.setdefault(r.difficulty, {'passed': 0, 'failed': 0})[outcome] += 1
+        by_category.setdefault(r.category, {'passed': 0, 'failed': 0})[outcome] += 1
     
     summary = EvaluationSummary(
         total_tests=len(results),
@@ -287,7 +412,8 @@ def run_evaluation(tests: List[Dict], verbose: bool = True) -> tuple[List[TestRe
         by_difficulty=by_difficulty,
         by_category=by_category,
         total_time=total_time,
-        total_tokens=total_tokens
+        total_tokens=total_tokens,
+        cached_tests=cached_tests
     )
     
     return results, summary
@@ -295,6 +421,9 @@ def run_evaluation(tests: List[Dict], verbose: bool = True) -> tuple[List[TestRe
 
 def display_results(results: List[TestResult], summary: EvaluationSummary):
     """Display evaluation results in a formatted table"""
+    # Imported here: rich.markdown pulls in markdown-it and pygments, which
+    # --help, --list and --quiet runs never need
+    from rich.markdown import Markdown
     
     # Results table
     table = Table(title="SAGE-BENCH Evaluation Results", show_header=True, header_style="bold magenta")
@@ -315,7 +444,7 @@ def display_results(results: List[TestResult], summary: EvaluationSummary):
             status,
             str(r.expected_answer)[:15],
             str(r.actual_answer)[:15] if r.actual_answer else "N/A",
-            f"{r.execution_time:.2f}"
+            "cache" if r.cached else f"{r.execution_time:.2f}"
         )
     
     console.print(table)
@@ -331,12 +460,15 @@ def display_results(results: List[TestResult], summary: EvaluationSummary):
         acc = stats['passed'] / total * 100 if total > 0 else 0
         summary_text += f"- {diff.capitalize()}: {stats['passed']}/{total} ({acc:.1f}%)\n"
     
+    live_tests = summary.total_tests - summary.cached_tests
     summary_text += f"""
 **Metrics:**
 - Total Time: {summary.total_time:.2f}s
 - Total Tokens: {summary.total_tokens:,}
-- Avg Time/Test: {summary.total_time / summary.total_tests:.2f}s
+- Avg Time/Test: {summary.total_time / live_tests if live_tests else 0:.2f}s
 """
+    if summary.cached_tests:
+        summary_text += f"- Replayed from cache (not in time/tokens): {summary.cached_tests}\n"
     
     console.print(Panel(Markdown(summary_text), title="📊 Summary", border_style="green"))
 
@@ -357,8 +489,7 @@ def save_results(results: List[TestResult], summary: EvaluationSummary, output_p
         'results': [asdict(r) for r in results]
     }
     
-    with open(output_path, 'w') as f:
-        json.dump(output, f, indent=2, default=str)
+    write_json(output_path, output)
     
     console.print(f"\n[dim]Results saved to: {output_path}[/dim]")
     return output_path
@@ -397,6 +528,11 @@ Examples:
     parser.add_argument('--output', '-o', help='Output file path for results')
     parser.add_argument('--quiet', '-q', action='store_true', help='Minimal output')
     parser.add_argument('--no-save', action='store_true', help='Do not save results to file')
+    parser.add_argument('--workers', type=int, default=1, help='Number of tests to run concurrently')
+    parser.add_argument('--executor', choices=['thread', 'process'], default='thread',
+                        help='Run concurrent tests in threads sharing one pipeline, or in processes with one pipeline each')
+    parser.add_argument('--cache', action='store_true', help='Reuse cached pipeline runs for questions answered before (excluded from timing)')
+    parser.add_argument('--cache-namespace', help='Cache namespace (default: fingerprint of the schema cache)')
     
     args = parser.parse_args()
     
@@ -468,8 +604,21 @@ Examples:
         border_style="blue"
     ))
     
-    # Run evaluation
-    results, summary = run_evaluation(tests, verbose=not args.quiet)
+    # Run evaluation, logging each result as it completes
+    log_path = None
+    if not args.no_save:
+        if args.output:
+            log_path = Path(args.output).with_suffix('.jsonl')
+            # run_evaluation appends, so drop a log left by an earlier run
+            # with the same --output rather than mixing its lines in
+            log_path.unlink(missing_ok=True)
+        else:
+            log_path = RESULTS_DIR / f"evaluation_{datetime.now().strftime('%Y%m%d_%H%M%S')}.jsonl"
+    cache = PipelineRunCache(namespace=args.cache_namespace) if args.cache else None
+    results, summary = run_evaluation(
+        tests, verbose=not args.quiet, log_path=log_path, workers=args.workers, cache=cache,
+        executor=args.executor
+    )
     
     # Display results
     if not args.quiet:
@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 
 from .config import AgentConfig, get_default_config, SAGEConfig
 from .tools import create_graph_tools, create_code_executor_tool, ToolRegistry
-from .graph_builder import ClinicalTrialGraphBuilder
+from .graph_builder import ClinicalTrialGraphBuilder, load_graph_file
 from .prompts import SAGE_AGENT_PROMPT
 from .engine import SAGEEngine
 
@@ -23,7 +23,7 @@ class SAGEAgent:
     def load_graph(self, path: str = None) -> None:
         path = path or self.config.graph.graph_path
         if os.path.exists(path):
-            self.graph = nx.read_graphml(path)
+            self.graph = load_graph_file(path)
             print(f"✓ Graph: {self.graph.number_of_nodes():,} nodes, {self.graph.number_of_edges():,} edges")
             self._register_tools()
         else:
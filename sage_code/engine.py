@@ -1,5 +1,8 @@
 import os
+import atexit
 import logging
+import logging.handlers
+import queue
 from typing import Dict, List, Tuple, Optional, Set, Any
 import networkx as nx
 
@@ -56,7 +59,13 @@ class SAGEEngine:
         if not logger.handlers:
             handler = logging.StreamHandler()
             handler.setFormatter(logging.Formatter("[SAGE-CODE] %(levelname)s: %(message)s"))
-            logger.addHandler(handler)
+            # Traversal logs heavily; format and write records on a background
+            # thread so the reasoning loop only pays for an enqueue
+            log_queue = queue.SimpleQueue()
+            listener = logging.handlers.QueueListener(log_queue, handler)
+            listener.start()
+            atexit.register(listener.stop)
+            logger.addHandler(logging.handlers.QueueHandler(log_queue))
         logger.setLevel(level)
     
     def set_llm(self, llm):
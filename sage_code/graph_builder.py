@@ -5,6 +5,8 @@ import networkx as nx
 from typing import Dict, List, Tuple, Optional
 from datetime import datetime
 import json
+import pickle
+import threading
 
 # Get project root directory
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -12,6 +14,61 @@ PROJECT_ROOT = os.path.dirname(SCRIPT_DIR)
 DATA_DIR = os.path.join(PROJECT_ROOT, "processed_data")
 
 
+# Graphs already loaded in this process, keyed by resolved GraphML path and
+# holding the file's mtime at load time
+_loaded_graphs: Dict[str, Tuple[float, nx.DiGraph]] = {}
+_loaded_graphs_lock = threading.Lock()
+
+
+def load_graph_file(path: str) -> nx.DiGraph:
+    """
+    Load a GraphML graph, reusing an in-process copy or a pickled copy.
+    
+    Callers loading the same file (e.g. a debate council per API request)
+    share one graph object until the file changes, so treat it as read-only.
+    Parsing the GraphML XML dominates start-up time; the pickle
+    (`<path>.pkl`) is rewritten whenever the GraphML file is newer.
+    
+    Args:
+        path: Path to the GraphML file
+        
+    Returns:
+        The loaded graph
+    """
+    key = os.path.realpath(path)
+    mtime = os.path.getmtime(key)
+    
+    # The lock also keeps concurrent first callers from each parsing the file
+    with _loaded_graphs_lock:
+        cached = _loaded_graphs.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        graph = _read_graph_file(key)
+        _loaded_graphs[key] = (mtime, graph)
+        return graph
+
+
+def _read_graph_file(path: str) -> nx.DiGraph:
+    """Read a GraphML file through its pickle sidecar"""
+    cache_path = path + ".pkl"
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(path):
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass  # Missing, stale or unreadable cache: fall back to GraphML
+    
+    graph = nx.read_graphml(path)
+    try:
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(graph, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Read-only location: keep working from GraphML
+    return graph
+
+
 class ClinicalTrialGraphBuilder:
     """Builds a knowledge graph from clinical trial CSV data."""
     
@@ -57,7 +114,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study_id = str(row.get("study", "")).strip()
             subject_id = str(row.get("subject", "")).strip()
             issue_count = row.get("total_open_issue_count_per_subject", 0)
@@ -89,7 +146,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study_id = str(row.get("study_id", "")).strip()
             country = str(row.get("country", "")).strip()
             site = str(row.get("site", "")).strip()
@@ -155,7 +212,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study = str(row.get("study", "")).strip()
             subject = str(row.get("subject", "")).strip()
             form_oid = str(row.get("form_oid", "")).strip()
@@ -209,7 +266,7 @@ class ClinicalTrialGraphBuilder:
         #     df = df.sample(n=50000, random_state=42)
         #     print(f"Sampling WHODD to 50000 records for performance")
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study = str(row.get("study", "")).strip()
             subject = str(row.get("subject", "")).strip()
             form_oid = str(row.get("form_oid", "")).strip()
@@ -258,7 +315,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study = str(row.get("study_name", "")).strip()
             country = str(row.get("sitegroupname_countryname_", "")).strip()
             site = str(row.get("sitenumber", "")).strip()
@@ -345,7 +402,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study = str(row.get("_source_study", "")).strip()
             country = str(row.get("country", "")).strip()
             site = str(row.get("site", "")).strip()
@@ -407,7 +464,7 @@ class ClinicalTrialGraphBuilder:
         if df is None:
             return
             
-        for _, row in df.iterrows():
+        for row in df.to_dict("records"):
             study = str(row.get("study", "")).strip()
             if not study:
                 continue
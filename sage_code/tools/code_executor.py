@@ -3,8 +3,13 @@
 import sys
 import io
 import os
+import pickle
+import re
+from functools import lru_cache
+from types import CodeType
 from typing import Type, Dict, Any
 from pydantic import BaseModel, Field
+import numpy as np
 import pandas as pd
 
 try:
@@ -15,6 +20,73 @@ except ImportError:
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(SCRIPT_DIR)), "processed_data")
 
+# Common LLM mistakes rewritten before exec: Series don't need .to_frame(),
+# and the data is already loaded so pd.read_csv calls are commented out
+_CLEANUP_REPLACEMENTS = {".to_frame()": "", "pd.read_csv": "# SKIP pd.read_csv"}
+_CLEANUP_PATTERN = re.compile(r"\.to_frame\(\)|pd\.read_csv")
+# Last lines that are statements rather than expressions to print
+_STATEMENT_PATTERN = re.compile(r"(?:if |for |while |def |class |import |#|try:|except|with )")
+
+# Builtins visible to executed code. Each exec gets its own copy (it has to
+# be a real dict: imports and numpy look names up in it as one), so a snippet
+# that rebinds or deletes an entry can't change the sandbox for later calls
+_SANDBOX_BUILTINS = {
+    'print': print, 'len': len, 'range': range, 'enumerate': enumerate, 
+    'zip': zip, 'sorted': sorted, 'list': list, 'dict': dict, 'set': set, 
+    'str': str, 'int': int, 'float': float, 'sum': sum, 'min': min, 'max': max,
+    'abs': abs, 'round': round, 'any': any, 'all': all, 'bool': bool,
+    'tuple': tuple, 'type': type, 'isinstance': isinstance,
+    '__import__': __import__
+}
+
+# Output kept from one exec; anything longer is cut before it reaches the LLM
+MAX_OUTPUT_CHARS = 64 * 1024
+
+
+class _BoundedStringIO(io.StringIO):
+    """StringIO that stops storing writes after `max_chars` and marks the cut."""
+    
+    def __init__(self, max_chars: int = MAX_OUTPUT_CHARS):
+        super().__init__()
+        self._remaining = max_chars
+        self.truncated = False
+    
+    def write(self, s: str) -> int:
+        if self.truncated:
+            return len(s)
+        if len(s) > self._remaining:
+            super().write(s[:self._remaining])
+            super().write("\n... [truncated]")
+            self.truncated = True
+            return len(s)
+        self._remaining -= len(s)
+        return super().write(s)
+
+
+@lru_cache(maxsize=256)
+def _compile_code(code: str) -> CodeType:
+    # The agent often re-runs the same snippet (retries, repeated questions)
+    return compile(code, "<string>", "exec")
+
+
+def _read_csv_cached(file_path: str) -> pd.DataFrame:
+    """Read a CSV through a pickled DataFrame sidecar (`<file>.pkl`)"""
+    cache_path = file_path + ".pkl"
+    try:
+        if os.path.getmtime(cache_path) >= os.path.getmtime(file_path):
+            return pd.read_pickle(cache_path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        pass  # Missing, stale or unreadable cache: parse the CSV
+    
+    df = pd.read_csv(file_path)
+    try:
+        tmp_path = cache_path + ".tmp"
+        df.to_pickle(tmp_path, compression=None)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass  # Read-only data directory: keep working from the CSV
+    return df
+
 
 class CodeExecutorInput(BaseModel):
     code: str = Field(description="Python/pandas code. Use any available DataFrame by name (shown in schema context).")
@@ -27,7 +99,11 @@ class CodeExecutorTool(BaseTool):
     def __init__(self, data_dir: str = None, **kwargs):
         self.data_dir = data_dir or DATA_DIR
         self._dfs: Dict[str, pd.DataFrame] = {}
+        self._schema_context: str = None
         self._load()
+        # Globals every exec starts from; _run copies them (and the builtins)
+        # so variables a snippet assigns don't leak into the next one
+        self._base_globs = {'pd': pd, 'np': np, **self._dfs}
         super().__init__(**kwargs)
     
     def _load(self):
@@ -35,7 +111,6 @@ class CodeExecutorTool(BaseTool):
         if not os.path.exists(self.data_dir):
             return
 
-        import re
         for filename in os.listdir(self.data_dir):
             if filename.endswith(".csv"):
                 file_path = os.path.join(self.data_dir, filename)
@@ -48,7 +123,7 @@ class CodeExecutorTool(BaseTool):
                     if not clean_name.endswith("_df"):
                         clean_name += "_df"
                     
-                    df = pd.read_csv(file_path)
+                    df = _read_csv_cached(file_path)
                     self._dfs[clean_name] = df
                     # print(f"Loaded {clean_name} from {filename}") 
                 except Exception as e:
@@ -56,6 +131,12 @@ class CodeExecutorTool(BaseTool):
                     
     def get_schema_context(self) -> str:
         """Generate a rich schema description with sample values."""
+        # The DataFrames never change after _load, so profile them once
+        if self._schema_context is None:
+            self._schema_context = self._build_schema_context()
+        return self._schema_context
+    
+    def _build_schema_context(self) -> str:
         if not self._dfs:
             return "No data loaded."
             
@@ -68,7 +149,7 @@ class CodeExecutorTool(BaseTool):
                 col_info = []
                 for col in df.columns:
                     # Get sample values (first 3 unique, non-null)
-                    samples = df[col].dropna().unique()[:3]
+                    samples = self._sample_values(df[col])
                     sample_str = ", ".join(map(str, samples))
                     col_info.append(f"  * {col} ({df[col].dtype}): e.g., [{sample_str}, ...]")
                 context.append("\n".join(col_info))
@@ -77,6 +158,16 @@ class CodeExecutorTool(BaseTool):
             context.append("")
             
         return "\n".join(context)
+
+    @staticmethod
+    def _sample_values(series: pd.Series, n: int = 3, window: int = 64):
+        """First `n` distinct non-null values, looking past the first `window` only if needed."""
+        positions = np.flatnonzero(series.notna().to_numpy())
+        samples = series.iloc[positions[:window]].unique()[:n]
+        if len(samples) < n and len(positions) > window:
+            samples = series.iloc[positions].unique()[:n]
+        return samples
+    
     def args_schema(self) -> Type[BaseModel]:
         return CodeExecutorInput
     
@@ -85,8 +176,7 @@ class CodeExecutorTool(BaseTool):
             return f"No data from {self.data_dir}"
         
         # Clean common LLM mistakes
-        code = code.replace(".to_frame()", "")  # Series doesn't need to_frame
-        code = code.replace("pd.read_csv", "# SKIP pd.read_csv")  # Already loaded
+        code = _CLEANUP_PATTERN.sub(lambda m: _CLEANUP_REPLACEMENTS[m.group()], code)
         
         # Auto-fix: If no print() in code, wrap the last expression
         if "print(" not in code:
@@ -94,7 +184,7 @@ class CodeExecutorTool(BaseTool):
             if lines:
                 last_line = lines[-1].strip()
                 # If last line is an expression (not assignment, if, for, etc.)
-                if not any(last_line.startswith(kw) for kw in ['if ', 'for ', 'while ', 'def ', 'class ', 'import ', '#', 'try:', 'except', 'with ']):
+                if not _STATEMENT_PATTERN.match(last_line):
                     if '=' in last_line and not last_line.startswith(' '):
                         # It's an assignment, add print after
                         var_name = last_line.split('=')[0].strip()
@@ -104,26 +194,10 @@ class CodeExecutorTool(BaseTool):
                         lines[-1] = f"print({last_line})"
                     code = "\n".join(lines)
         
-        old_stdout, sys.stdout = sys.stdout, io.StringIO()
+        old_stdout, sys.stdout = sys.stdout, _BoundedStringIO()
         try:
-            globs = {
-                'pd': pd, 
-                **self._dfs, 
-                '__builtins__': {
-                    'print': print, 'len': len, 'range': range, 'enumerate': enumerate, 
-                    'zip': zip, 'sorted': sorted, 'list': list, 'dict': dict, 'set': set, 
-                    'str': str, 'int': int, 'float': float, 'sum': sum, 'min': min, 'max': max,
-                    'abs': abs, 'round': round, 'any': any, 'all': all, 'bool': bool,
-                    'tuple': tuple, 'type': type, 'isinstance': isinstance,
-                    '__import__': __import__
-                }
-            }
-            try:
-                import numpy as np
-                globs['np'] = np
-            except:
-                pass
-            exec(code, globs)
+            globs = {**self._base_globs, '__builtins__': dict(_SANDBOX_BUILTINS)}
+            exec(_compile_code(code), globs)
             output = sys.stdout.getvalue()
             return output if output else "Code executed successfully (no print output)"
         except Exception as e:
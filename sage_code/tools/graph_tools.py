@@ -46,7 +46,9 @@ class GraphQueryMixin:
         return [n for n, d in self.graph.nodes(data=True) if d.get("node_type") == t] if self.graph else []
     
     def _props(self, node: str) -> Dict:
-        return dict(self.graph.nodes[node]) if self.graph and self.graph.has_node(node) else {}
+        # The graph's own attribute dict, not a copy: tools only read it, and
+        # copying every node's properties on each lookup is wasted work
+        return self.graph.nodes[node] if self.graph and self.graph.has_node(node) else {}
     
     def _neighbors(self, node: str, edge_type: str = None) -> List[tuple]:
         if not self.graph:
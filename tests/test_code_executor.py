@@ -0,0 +1,50 @@
+
+import sys
+import os
+import tempfile
+
+# Setup path
+sys.path.insert(0, os.getcwd())
+
+from sage_code.tools.code_executor import create_code_executor_tool
+
+
+def _make_tool(data_dir: str):
+    with open(os.path.join(data_dir, "sites.csv"), "w") as f:
+        f.write("site,open_queries\nA,3\nB,5\n")
+    return create_code_executor_tool(data_dir=data_dir)
+
+
+def test_builtins_mutation_does_not_leak():
+    print("Testing sandbox builtins isolation between executions...")
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        tool = _make_tool(data_dir)
+        
+        mutated = tool._run("__builtins__['len'] = lambda obj: -1\ndel __builtins__['sum']\nprint(len([]))")
+        assert mutated == "-1\n"
+        
+        # A later snippet (and a fresh tool) must still see the real builtins
+        assert tool._run("print(len(sites_df), sum([1, 2]))") == "2 3\n"
+        assert _make_tool(data_dir)._run("print(len(sites_df))") == "2\n"
+    
+    print("\n✅ SUCCESS: Builtins changes stay inside one execution.")
+
+
+def test_globals_do_not_leak():
+    print("Testing sandbox globals isolation between executions...")
+    
+    with tempfile.TemporaryDirectory() as data_dir:
+        tool = _make_tool(data_dir)
+        
+        assert tool._run("leftover = 1\nsites_df = None\nprint(sites_df)") == "None\n"
+        
+        assert "name 'leftover' is not defined" in tool._run("print(leftover)")
+        assert tool._run("print(sites_df['open_queries'].sum())") == "8\n"
+    
+    print("\n✅ SUCCESS: Assignments stay inside one execution.")
+
+
+if __name__ == "__main__":
+    test_builtins_mutation_does_not_leak()
+    test_globals_do_not_leak()
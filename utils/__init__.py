@@ -1,2 +1,10 @@
-from utils.token_utils import TokenManager, token_manager
-from utils.llm_client import GroqLLMClient
+# Lazy imports: token_utils loads a tiktoken encoding and llm_client builds
+# the Groq client, which modules that only need json_io shouldn't pay for
+def __getattr__(name):
+    if name in ('TokenManager', 'token_manager'):
+        from utils import token_utils
+        return getattr(token_utils, name)
+    elif name == 'GroqLLMClient':
+        from utils.llm_client import GroqLLMClient
+        return GroqLLMClient
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
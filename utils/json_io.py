@@ -0,0 +1,47 @@
+"""
+JSON file helpers that use orjson when it is installed
+"""
+import json
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+if orjson is not None:
+    # Datetimes go through `default` so they serialize exactly as
+    # json.dump(default=str) does
+    _WRITE_OPTIONS = orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+    _LINE_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_APPEND_NEWLINE
+
+
+def read_json(path: Path) -> Any:
+    """Read a JSON file, using orjson's C parser when installed"""
+    if orjson is not None:
+        with open(path, 'rb') as f:
+            return orjson.loads(f.read())
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def write_json(path: Path, data: Any):
+    """Write indented JSON, stringifying values JSON can't represent"""
+    if orjson is not None:
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=_WRITE_OPTIONS, default=str))
+        return
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2, default=str)
+
+
+def json_line(record: Any) -> str:
+    """Serialize one record (a dict or dataclass) as a JSON Lines line"""
+    if orjson is not None:
+        # orjson serializes dataclasses directly, without asdict's deep copy
+        return orjson.dumps(record, option=_LINE_OPTIONS, default=str).decode()
+    if is_dataclass(record):
+        record = asdict(record)
+    return json.dumps(record, default=str) + '\n'
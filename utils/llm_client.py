@@ -3,8 +3,10 @@ Groq LLM Client for the Text-to-SQL agents
 """
 import os
 import time
-from typing import List, Dict, Any, Optional
-from groq import Groq
+import threading
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Callable
+from groq import Groq, DefaultHttpxClient
 import json
 import re
 
@@ -12,6 +14,64 @@ from config.settings import GROQ_API_KEY, MODELS, AGENT_CONFIG
 from utils.token_utils import token_manager
 
 
+@lru_cache(maxsize=1)
+def _shared_http_client() -> DefaultHttpxClient:
+    """
+    One keep-alive connection pool for every GroqLLMClient in the process, so
+    agents and pipelines that each build their own client still reuse open
+    TLS connections instead of handshaking per client.
+    """
+    return DefaultHttpxClient()
+
+
+def _retry_wait(error: Exception, attempt: int) -> float:
+    """
+    Seconds to wait before retrying a rate-limited request.
+    
+    Uses the provider's Retry-After header when the error carries one, so a
+    short per-minute limit is not met with a fixed multi-minute pause;
+    otherwise falls back to exponential backoff (30s, 60s, 120s).
+    """
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        return max(float(headers['retry-after']), 1.0)
+    except (KeyError, TypeError, ValueError):
+        return 30 * (2 ** attempt)
+
+
+class _StreamInterrupted(Exception):
+    """A streaming completion failed after some tokens were already forwarded"""
+
+
+class _RequestPacer:
+    """
+    Spaces request starts at least 60 / requests_per_minute seconds apart,
+    across every thread in the process.
+    
+    A caller only sleeps for whatever remains of its slot, so time already
+    spent waiting on the previous response counts toward the interval.
+    """
+    
+    def __init__(self, requests_per_minute: int):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+    
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_slot)
+            self._next_slot = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_request_pacer = _RequestPacer(AGENT_CONFIG.get('requests_per_minute', 0))
+
+
 class GroqLLMClient:
     """Client for interacting with Groq API"""
     
@@ -20,7 +80,7 @@ class GroqLLMClient:
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not set. Please set it in .env file")
         
-        self.client = Groq(api_key=self.api_key)
+        self.client = Groq(api_key=self.api_key, http_client=_shared_http_client())
         self.usage_stats = {
             'total_input_tokens': 0,
             'total_output_tokens': 0,
@@ -35,7 +95,8 @@ class GroqLLMClient:
         max_tokens: int = 2048,
         json_mode: bool = False,
         stop: List[str] = None,
-        max_retries: int = 3
+        max_retries: int = 3,
+        on_token: Optional[Callable[[str], None]] = None
     ) -> Dict[str, Any]:
         """
         Send a chat completion request to Groq with retry logic for rate limits
@@ -48,6 +109,8 @@ class GroqLLMClient:
             json_mode: Whether to request JSON output
             stop: Stop sequences
             max_retries: Maximum number of retries for rate limit errors
+            on_token: If given, stream the response and call this with each
+                text fragment as it arrives (the full text is still returned)
             
         Returns:
             Dict with 'content', 'usage', and 'model' keys
@@ -71,6 +134,12 @@ class GroqLLMClient:
         last_error = None
         for attempt in range(max_retries + 1):
             try:
+                # Stay under the provider's request rate instead of running
+                # into 429s and their retry pauses
+                _request_pacer.wait()
+                if on_token is not None:
+                    return self._stream_completion(kwargs, on_token)
+                
                 response = self.client.chat.completions.create(**kwargs)
                 
                 # Update usage stats
@@ -91,11 +160,13 @@ class GroqLLMClient:
                 
             except Exception as e:
                 last_error = str(e)
+                # Retrying would forward the already-streamed tokens a second time
+                if isinstance(e, _StreamInterrupted):
+                    break
                 # Check for rate limit error (429)
                 if '429' in str(e) or 'rate' in str(e).lower() or 'too many' in str(e).lower():
                     if attempt < max_retries:
-                        # Exponential backoff: 30s, 60s, 120s
-                        wait_time = 30 * (2 ** attempt)
+                        wait_time = _retry_wait(e, attempt)
                         print(f"⚠️ Rate limited. Waiting {wait_time}s before retry {attempt + 1}/{max_retries}...")
                         time.sleep(wait_time)
                         continue
@@ -109,6 +180,44 @@ class GroqLLMClient:
             'model': model
         }
     
+    def _stream_completion(self, kwargs: Dict[str, Any], on_token: Callable[[str], None]) -> Dict[str, Any]:
+        """Run a streaming completion, forwarding fragments to on_token"""
+        parts = []
+        usage = None
+        finish_reason = None
+        
+        try:
+            for chunk in self.client.chat.completions.create(stream=True, **kwargs):
+                if chunk.choices:
+                    choice = chunk.choices[0]
+                    if choice.delta and choice.delta.content:
+                        parts.append(choice.delta.content)
+                        on_token(choice.delta.content)
+                    finish_reason = choice.finish_reason or finish_reason
+                # Groq reports token usage on the final chunk
+                x_groq = getattr(chunk, 'x_groq', None)
+                if x_groq is not None and getattr(x_groq, 'usage', None):
+                    usage = x_groq.usage
+        except Exception as e:
+            if parts:
+                raise _StreamInterrupted(str(e)) from e
+            raise
+        
+        if usage:
+            self.usage_stats['total_input_tokens'] += usage.prompt_tokens
+            self.usage_stats['total_output_tokens'] += usage.completion_tokens
+            self.usage_stats['total_requests'] += 1
+        
+        return {
+            'content': ''.join(parts),
+            'usage': {
+                'input_tokens': usage.prompt_tokens if usage else 0,
+                'output_tokens': usage.completion_tokens if usage else 0
+            },
+            'model': kwargs['model'],
+            'finish_reason': finish_reason
+        }
+    
     def extract_json(self, text: str) -> Optional[Dict]:
         """Extract JSON from text response"""
         if not text: